@@ -170,6 +170,18 @@ def makeBranchEval(first_branch):
     return score
 
 
+def playRandomMoves(board, num_moves):
+    """Apply up to `num_moves` random legal moves to the board, and return
+    True if the active player still has legal moves afterwards.
+    """
+    for _ in range(num_moves):
+        moves = board.get_legal_moves()
+        if not moves:
+            return False
+        board.apply_move(random.choice(moves))
+    return bool(board.get_legal_moves())
+
+
 class CounterBoard(isolation.Board):
     """Subclass of the isolation board that maintains counters for the number
     of unique nodes and total nodes visited during depth first search.
@@ -570,6 +582,791 @@ class CustomTest(unittest.TestCase):
             self.assertTrue(chosen_move in legal_moves, INVALID_MOVE.format(
                 legal_moves, chosen_move))
 
+    @timeout(5)
+    def test_bitboard_matches_board(self):
+        """ Test isolation.BitBoard against isolation.Board on random games """
+        for w, h in [(7, 7), (5, 8)]:
+            for _ in range(20):
+                board = isolation.Board("Player1", "Player2", w, h)
+                bitboard = isolation.BitBoard("Player1", "Player2", w, h)
+                while True:
+                    moves = board.get_legal_moves()
+                    self.assertEqual(moves, bitboard.get_legal_moves())
+                    self.assertEqual(board.to_string(), bitboard.to_string())
+                    for player in ("Player1", "Player2"):
+                        self.assertEqual(board.utility(player), bitboard.utility(player))
+                        self.assertEqual(board.is_winner(player), bitboard.is_winner(player))
+                        self.assertEqual(board.is_loser(player), bitboard.is_loser(player))
+                    if not moves:
+                        break
+                    move = random.choice(moves)
+                    board.apply_move(move)
+                    bitboard = bitboard.forecast_move(move)
+                self.assertEqual(isolation.Board.from_board(bitboard).to_string(),
+                                 isolation.BitBoard.from_board(board).to_string())
+
+    @timeout(5)
+    def test_undo_move(self):
+        """ Test that undo_move() reverts apply_move() on both board engines """
+        for board_cls in (isolation.Board, isolation.BitBoard):
+            board = board_cls("Player1", "Player2")
+            states = []
+            while board.get_legal_moves():
+                states.append((board.to_string(), board.get_legal_moves(),
+                               board.active_player, board.move_count))
+                board.apply_move(random.choice(board.get_legal_moves()))
+            while states:
+                board.undo_move()
+                self.assertEqual(states.pop(), (board.to_string(), board.get_legal_moves(),
+                                                board.active_player, board.move_count))
+            self.assertRaises(RuntimeError, board.undo_move)
+
+    @timeout(10)
+    def test_inplace_search(self):
+        """ Test that in-place search agrees with search on board copies """
+        from sample_players import improved_score
+        for method in ("minimax", "alphabeta"):
+            for board_cls in (isolation.Board, isolation.BitBoard):
+                copying = game_agent.CustomPlayer(3, improved_score, False, method)
+                inplace = game_agent.CustomPlayer(3, improved_score, False, method, inplace=True)
+                for agentUT in (copying, inplace):
+                    agentUT.time_left = lambda: 1e3
+                board = board_cls(copying, inplace)
+                board.apply_move((2, 3))
+                board.apply_move((4, 4))
+                before = board.to_string()
+                self.assertEqual(getattr(copying, method)(board, 3),
+                                 getattr(inplace, method)(board, 3))
+                self.assertEqual(before, board.to_string())
+
+    @timeout(5)
+    def test_hash_key(self):
+        """ Test the incremental Zobrist keys of both board engines """
+        for board_cls in (isolation.Board, isolation.BitBoard):
+            board = board_cls("Player1", "Player2")
+            keys = []
+            while board.get_legal_moves():
+                board.apply_move(random.choice(board.get_legal_moves()))
+                self.assertEqual(board.hash_key, board._compute_hash_key())
+                self.assertEqual(board.forecast_move(board.get_blank_spaces()[0]).hash_key,
+                                 board.copy().forecast_move(board.get_blank_spaces()[0]).hash_key)
+                keys.append(board.hash_key)
+            self.assertEqual(len(keys), len(set(keys)))
+            while keys:
+                self.assertEqual(board.hash_key, keys.pop())
+                board.undo_move()
+            self.assertEqual(board.hash_key, 0)
+
+        # the same position reached through different move orders
+        first = isolation.Board("Player1", "Player2")
+        second = isolation.BitBoard("Player1", "Player2")
+        for move in [(0, 2), (6, 6), (2, 1), (4, 5), (4, 2), (6, 4), (2, 3)]:
+            first.apply_move(move)
+        for move in [(4, 2), (6, 6), (2, 1), (4, 5), (0, 2), (6, 4)]:
+            second.apply_move(move)
+        self.assertNotEqual(first, second)
+        second.apply_move((2, 3))
+        self.assertEqual(first, second)
+        self.assertEqual(hash(first), hash(second))
+        self.assertEqual({first: 1}[second], 1)
+
+    @timeout(20)
+    def test_transposition_table(self):
+        """ Test that alphabeta returns the same values with and without a
+        transposition table for fixed-depth searches """
+        from sample_players import improved_score
+        from transposition import TranspositionTable
+        agentUT = game_agent.CustomPlayer(3, improved_score, False, "alphabeta", inplace=True)
+        agentUT.time_left = lambda: 1e3
+        for _ in range(10):
+            board = isolation.BitBoard(agentUT, "null_agent")
+            if not playRandomMoves(board, 2 * random.randint(1, 6)):
+                continue
+            for depth in (3, 4):
+                agentUT.tt = None
+                expected, _ = agentUT.alphabeta(board, depth)
+                agentUT.tt = TranspositionTable(1024)
+                value, move = agentUT.alphabeta(board, depth)
+                self.assertEqual(expected, value)
+                self.assertIn(move, board.get_legal_moves())
+                self.assertLessEqual(agentUT.tt.stats()["entries"], 1024)
+
+    @timeout(20)
+    def test_pvs(self):
+        """ Test that principal variation search and aspiration windows find
+        the same values as alphabeta """
+        from sample_players import improved_score
+        from move_ordering import MoveOrderer
+        agentUT = game_agent.CustomPlayer(3, improved_score, False, "pvs", inplace=True,
+                                          move_orderer=MoveOrderer(), aspiration_window=0.5)
+        agentUT.time_left = lambda: 1e3
+        for _ in range(10):
+            board = isolation.BitBoard(agentUT, "null_agent")
+            if not playRandomMoves(board, 2 * random.randint(1, 6)):
+                continue
+            for depth in (2, 3, 4):
+                expected, _ = agentUT.alphabeta(board, depth)
+                self.assertEqual(expected, agentUT.pvs(board, depth)[0])
+                self.assertEqual(expected, agentUT._search_iteration(board, depth, expected + 1.)[0])
+
+    @timeout(5)
+    def test_move_ordering(self):
+        """ Test that the hash move is ordered first, then the killer moves,
+        then the remaining moves by history score """
+        from move_ordering import MoveOrderer
+        orderer = MoveOrderer()
+        moves = [(0, 1), (1, 2), (2, 3), (3, 4), (4, 5)]
+        self.assertEqual(0., orderer.first_move_cutoff_rate)
+
+        # history scores grow with the square of the remaining depth
+        orderer.record_cutoff((0, 1), 20, 1, 0)
+        orderer.record_cutoff((1, 2), 25, 2, 3)
+        orderer.record_cutoff((1, 2), 30, 1, 1)
+        self.assertEqual([(1, 2), (0, 1)], orderer.order(moves, 40, 0)[:2])
+        self.assertEqual(1 / 3, orderer.first_move_cutoff_rate)
+        self.assertEqual({"cutoffs": 3, "first_move_cutoffs": 1,
+                          "first_move_cutoff_rate": 1 / 3}, orderer.stats())
+
+        # killer moves only apply at their own ply and beat any history score
+        self.assertEqual([(0, 1), (1, 2)], orderer.order(moves, 20, 0)[:2])
+        orderer.record_cutoff((4, 5), 20, 1, 2)
+        orderer.record_cutoff((3, 4), 20, 1, 4)
+        self.assertEqual([(3, 4), (4, 5)], orderer.killers[20])
+        self.assertEqual([(3, 4), (4, 5), (1, 2)], orderer.order(moves, 20, 0)[:3])
+        self.assertEqual(0.2, orderer.first_move_cutoff_rate)
+
+        # the recorded best move comes first, unless a hash move is given
+        orderer.record_best(7, (2, 3))
+        self.assertEqual([(2, 3), (3, 4), (4, 5), (1, 2), (0, 1)], orderer.order(moves, 20, 7))
+        self.assertEqual((0, 1), orderer.order(moves, 20, 7, hash_move=(0, 1))[0])
+        self.assertEqual((3, 4), orderer.order(moves, 20, 8)[0])
+
+        # a new search forgets the best moves and halves the history scores,
+        # dropping those that reach zero
+        orderer.new_search()
+        self.assertEqual({(1, 2): 2}, orderer.history)
+        self.assertEqual((3, 4), orderer.order(moves, 20, 7)[0])
+
+    @timeout(20)
+    def test_ponder(self):
+        """ Test that a pondering agent plays a complete game, uses the
+        results of its worker and stops it when the game ends """
+        import time
+        from sample_players import improved_score
+        agentUT = game_agent.CustomPlayer(score_fn=improved_score, method="alphabeta",
+                                          inplace=True, ponder=True)
+        opponent = game_agent.CustomPlayer(score_fn=improved_score, method="alphabeta")
+        board = isolation.Board(agentUT, opponent, 5, 5)
+        board.apply_move((2, 2))
+        board.apply_move((0, 0))
+        _, _, termination = board.play(time_limit=150)
+        self.assertFalse(agentUT.pondering.running)
+        # the worker always completes its first iteration, so every search
+        # started on the opponent's time is counted as a hit or a miss
+        self.assertGreater(agentUT.ponder_hits + agentUT.ponder_misses, 0)
+
+        # the worker's transposition table entries are loaded when pondering
+        # stops, including the root entry of its deepest iteration
+        board = isolation.Board(agentUT, opponent)
+        for move in ((2, 3), (0, 5), (4, 4), (2, 4)):
+            board.apply_move(move)
+        agentUT.pondering.start(board, agentUT)
+        agentUT._ponder_key = agentUT._position_key(board)
+        time.sleep(0.1)
+        agentUT._stop_pondering()
+        result = agentUT._ponder_result
+        entry = agentUT.tt.probe(agentUT._ponder_key)
+        if result.depth >= 2:
+            self.assertEqual((result.depth, result.score, result.move), (entry[1], entry[2], entry[4]))
+        agentUT.close()
+        self.assertIsNone(agentUT.pondering.process)
+
+    @timeout(20)
+    def test_parallel_search(self):
+        """ Test that splitting the root moves between processes finds the
+        same values as a single process search, including for finished
+        games, which the heuristic does not score as wins or losses """
+        agentUT = game_agent.CustomPlayer(3, game_agent.free_spaces_around_player, False, "alphabeta",
+                                          processes=2)
+        agentUT.time_left = lambda: 1e4
+        try:
+            for _ in range(10):
+                board = isolation.BitBoard(agentUT, "null_agent")
+                if not playRandomMoves(board, 2 * random.randint(1, 12)):
+                    continue
+                expected, _ = agentUT.alphabeta(board, 3)
+                value, move = agentUT.parallel.search(board, agentUT, lambda: 1e4, 10, [3])
+                self.assertEqual(expected, value)
+                self.assertIn(move, board.get_legal_moves())
+                self.assertIn(agentUT.get_move(board, board.get_legal_moves(), lambda: 1e4),
+                              board.get_legal_moves())
+
+            # a search whose workers miss the deadline abandons their pool,
+            # which is terminated by the next search
+            board = isolation.BitBoard(agentUT, "null_agent")
+            board.apply_move((3, 3))
+            board.apply_move((2, 3))
+            value, move = agentUT.parallel.search(board, agentUT, lambda: 5, 10, [3])
+            self.assertEqual(float("-inf"), value)
+            self.assertIn(move, board.get_legal_moves())
+            self.assertIsNone(agentUT.parallel.pool)
+            self.assertIsNotNone(agentUT.parallel.abandoned_pool)
+            agentUT.parallel.search(board, agentUT, lambda: 1e4, 10, [1])
+            self.assertIsNone(agentUT.parallel.abandoned_pool)
+            self.assertIsNotNone(agentUT.parallel.pool)
+        finally:
+            agentUT.close()
+        self.assertIsNone(agentUT.parallel.pool)
+        self.assertIsNone(agentUT.parallel.abandoned_pool)
+
+    @timeout(20)
+    def test_mcts_player(self):
+        """ Test that the MCTS agent returns a move in time, finishes a game,
+        reuses its tree between turns and leaves the game unchanged """
+        from mcts_player import MCTSPlayer
+        from sample_players import improved_score
+        board = isolation.Board("player_1", "player_2", 5, 5)
+        board.apply_move((2, 2))
+        board.apply_move((0, 0))
+        agentUT = MCTSPlayer()
+        start = curr_time_millis()
+        move = agentUT.get_move(board, board.get_legal_moves(),
+                                lambda: 50 - (curr_time_millis() - start))
+        self.assertIn(move, board.get_legal_moves())
+        self.assertGreater(agentUT.iterations, 0)
+
+        # the game is played with budgets rather than timed, so that the
+        # test does not depend on the load of the machine
+        agentUT = MCTSPlayer(iteration_budget=200)
+        opponent = game_agent.CustomPlayer(2, improved_score, False, "alphabeta")
+        board = isolation.Board(agentUT, opponent, 5, 5)
+        board.apply_move((2, 2))
+        board.apply_move((0, 0))
+        key = board.hash_key
+        move = agentUT.get_move(board, board.get_legal_moves(), lambda: float("inf"))
+        self.assertIn(move, board.get_legal_moves())
+        self.assertEqual(key, board.hash_key)
+        self.assertEqual(200, agentUT.iterations)
+
+        board.apply_move(move)
+        board.apply_move(max(board.get_legal_moves(),
+                             key=lambda m: [c.visits for c in agentUT._root.children if c.move == m]))
+        winner, _, termination = board.play(time_limit=float("inf"))
+        self.assertNotEqual("timeout", termination)
+        self.assertGreater(agentUT.reused_visits, 0)
+        self.assertIsNone(agentUT._root)
+
+    @timeout(20)
+    def test_endgame_solver(self):
+        """ Test that the endgame solver agrees with a full-depth search once
+        the players are partitioned """
+        from endgame import EndgameSolver, partitioned
+        from sample_players import null_score
+        agentUT = game_agent.CustomPlayer(score_fn=null_score, method="alphabeta", inplace=True,
+                                          endgame=True)
+        agentUT.time_left = lambda: 1e4
+        solver = EndgameSolver()
+        solved = 0
+        while solved < 10:
+            board = isolation.BitBoard(agentUT, "null_agent", 5, 5)
+            while not partitioned(board) and playRandomMoves(board, 1):
+                pass
+            if board.active_player != agentUT or not board.get_legal_moves():
+                continue
+            value, move, length, _ = solver.solve(board, agentUT)
+            expected, _ = agentUT.alphabeta(board, len(board.get_blank_spaces()))
+            self.assertEqual(expected, value)
+            self.assertIn(move, board.get_legal_moves())
+            self.assertIn(agentUT.get_move(board, board.get_legal_moves(), lambda: 1e4),
+                          board.get_legal_moves())
+            solved += 1
+        self.assertEqual(10, agentUT.endgame_solutions)
+
+        # a player confined to a single cell loses without the opponent's
+        # region of 40 cells being searched exhaustively
+        board = isolation.BitBoard(agentUT, "null_agent")
+        state = [[0] * 7 for _ in range(7)]
+        for row, col in ((0, 0), (2, 1), (2, 0), (3, 1), (3, 3), (2, 4), (0, 4)):
+            state[row][col] = 1
+        state[6][6] = 2
+        board.__board_state__ = state
+        board.__last_player_move__ = {agentUT: (0, 0), "null_agent": (6, 6)}
+        self.assertTrue(partitioned(board))
+        solver = EndgameSolver(max_cells=49)
+        self.assertEqual((float("-inf"), (1, 2), 1), solver.solve(board, agentUT)[:3])
+        self.assertLess(solver.nodes, 10)
+
+    def test_time_manager(self):
+        """ Test that the time manager declines iterations predicted to
+        overrun the turn and logs its predictions """
+        from time_manager import TimeManager, COMPLETED, DECLINED
+        manager = TimeManager(branching_factor=3.)
+        manager.new_search()
+        self.assertTrue(manager.should_search(1, 100., 10.))
+        manager.record_iteration(1, 2., 1., (0, 0))
+        self.assertEqual(6., manager.predict())
+        manager.record_iteration(2, 8., 1., (0, 0))
+        self.assertEqual(32., manager.predict())
+        self.assertTrue(manager.should_search(3, 50., 10.))
+        self.assertFalse(manager.should_search(3, 40., 10.))
+        self.assertEqual([COMPLETED, COMPLETED, DECLINED], [record.status for record in manager.log])
+
+        # a changed best move makes the position critical
+        manager.record_iteration(3, 16., 1., (1, 1))
+        self.assertTrue(manager.should_search(4, 35., 10.))
+        manager.record_iteration(4, 16., float("inf"), (1, 1))
+        self.assertFalse(manager.should_search(5, 1000., 10.))
+
+    @timeout(5)
+    def test_amortized_deadline(self):
+        """ Test that amortized deadline checks read the clock less often
+        and still stop the search in time """
+        from deadline import Deadline
+        from sample_players import improved_score
+        agentUT = game_agent.CustomPlayer(score_fn=improved_score, method="alphabeta",
+                                          amortize_clock=True)
+        board = isolation.Board(agentUT, "null_agent")
+        start = curr_time_millis()
+        time_left = lambda: 100 - (curr_time_millis() - start)
+        move = agentUT.get_move(board, board.get_legal_moves(), time_left)
+        self.assertIn(move, board.get_legal_moves())
+        self.assertGreater(time_left(), 0)
+
+        deadline = Deadline()
+        start = curr_time_millis()
+        deadline.reset(lambda: 20., 0.)
+        while not deadline.expired():
+            pass
+        self.assertGreater(deadline.interval, 1)
+        self.assertLess(curr_time_millis() - start, 20. + 10 * deadline.max_gap)
+
+    def test_eval_cache(self):
+        """ Test that the evaluation cache returns the scores of the wrapped
+        function and evicts the least recently used entries """
+        from eval_cache import EvalCache
+        from sample_players import improved_score
+        cache = EvalCache(improved_score, max_entries=4)
+        self.assertEqual("improved_score", cache.__name__)
+        board = isolation.Board("player_1", "player_2")
+        for move in ((2, 3), (0, 5), (4, 4), (2, 4)):
+            board.apply_move(move)
+        boards = [board.forecast_move(move) for move in board.get_legal_moves()]
+        self.assertTrue(boards)
+        for child in boards:
+            for player in ("player_1", "player_2"):
+                self.assertEqual(improved_score(child, player), cache(child, player))
+                self.assertEqual(improved_score(child, player), cache(child, player))
+        self.assertEqual(2 * len(boards), cache.hits)
+        self.assertEqual(2 * len(boards), cache.misses)
+        self.assertEqual(min(4, 2 * len(boards)), len(cache))
+        self.assertEqual(0.5, cache.stats()["hit_rate"])
+
+    def test_count_blank_cells(self):
+        """ Test that both board engines count the blank cells of any
+        rectangle, before and after moves are applied and undone """
+        for width, height in ((7, 7), (5, 8)):
+            for engine in (isolation.Board, isolation.BitBoard):
+                board = engine("player_1", "player_2", width, height)
+                playRandomMoves(board, 6)
+                for _ in range(3):
+                    for top, bottom in ((0, height - 1), (1, 3), (2, 2)):
+                        for left, right in ((0, width - 1), (0, 2), (3, 4)):
+                            expected = sum(1 for row, col in board.get_blank_spaces()
+                                           if top <= row <= bottom and left <= col <= right)
+                            self.assertEqual(expected, board.count_blank_cells(top, left, bottom, right))
+                    moves = board.get_legal_moves()
+                    if not moves:
+                        break
+                    board.apply_move(moves[0])
+                board.undo_move()
+                self.assertEqual(len(board.get_blank_spaces()),
+                                 board.count_blank_cells(0, 0, height - 1, width - 1))
+
+    def test_feature_engine(self):
+        """ Test that the feature engine reproduces the existing heuristics,
+        including in finished games """
+        import features
+        from sample_players import null_score, open_move_score, improved_score
+        heuristics = [(features.null_features, null_score),
+                      (features.open_move_features, open_move_score),
+                      (features.improved_features, improved_score),
+                      (features.blank_features, game_agent.free_spaces_around_player),
+                      (features.blank_improved_features, game_agent.free_spaces_around_player_improved),
+                      (features.blank_minus_length_features,
+                       game_agent.free_spaces_around_player_minus_length)]
+        for engine in (isolation.Board, isolation.BitBoard):
+            for _ in range(50):
+                board = engine("player_1", "player_2")
+                playRandomMoves(board, random.randint(2, 40))
+                for player in ("player_1", "player_2"):
+                    for feature_engine, heuristic in heuristics:
+                        self.assertEqual(heuristic(board, player), feature_engine(board, player))
+        self.assertRaises(ValueError, features.FeatureEngine, {"no_such_feature": 1.})
+
+    def test_batch_leaves(self):
+        """ Test that batch scoring matches scoring each successor, and that
+        searches scoring their leaves in batches choose the same moves """
+        import features
+        engines = [features.improved_features, features.open_move_features,
+                   features.FeatureEngine({"own_moves": 0.5, "opp_moves": -2.}, win=None, loss=None),
+                   features.FeatureEngine({"own_moves": 1., "own_second_moves": 0.25})]
+        for engine in (isolation.Board, isolation.BitBoard):
+            for _ in range(50):
+                board = engine("player_1", "player_2")
+                playRandomMoves(board, random.randint(0, 40))
+                moves = board.get_legal_moves()
+                before = board.to_string()
+                for player in ("player_1", "player_2"):
+                    for feature_engine in engines:
+                        expected = [feature_engine(board.forecast_move(move), player) for move in moves]
+                        self.assertEqual(expected, feature_engine.score_many(board, moves, player))
+                self.assertEqual(before, board.to_string())
+
+            for method in ("minimax", "alphabeta", "pvs"):
+                for inplace in (False, True):
+                    seed = random.random()
+                    moves = []
+                    for batch_leaves in (False, True):
+                        agentUT = game_agent.CustomPlayer(3, features.improved_features, False, method,
+                                                          inplace=inplace, batch_leaves=batch_leaves)
+                        board = engine(agentUT, "null_agent")
+                        random.seed(seed)
+                        playRandomMoves(board, 6)
+                        moves.append(agentUT.get_move(board, board.get_legal_moves(), lambda: 1e4))
+                    self.assertEqual(moves[0], moves[1])
+
+    def test_analyse(self):
+        """ Test that the analysis ranks the best moves with the scores of a
+        full minimax search of every root move """
+        from sample_players import improved_score
+        for method in ("minimax", "alphabeta", "pvs"):
+            for tt_size in (0, 1000):
+                agentUT = game_agent.CustomPlayer(3, improved_score, False, method, tt_size=tt_size)
+                board = isolation.Board(agentUT, "null_agent")
+                if not playRandomMoves(board, random.randint(2, 20)):
+                    continue
+                maximizing = board.active_player == agentUT
+                lines = agentUT.analyse(board, k=3)
+
+                agentUT.time_left = lambda: 1e4
+                expected = sorted((agentUT.minimax(board.forecast_move(move), 2, not maximizing)[0]
+                                   for move in board.get_legal_moves()), reverse=maximizing)
+                self.assertEqual(expected[:3], [line.score for line in lines])
+                for line in lines:
+                    self.assertEqual(3, line.depth)
+                    self.assertEqual(line.move, line.pv[0])
+                    self.assertLessEqual(len(line.pv), 3)
+
+    def test_iter_search(self):
+        """ Test that the streaming search yields the result of every
+        iteration and that the iteration callback can stop get_move() """
+        import itertools
+        from sample_players import improved_score
+        agentUT = game_agent.CustomPlayer(score_fn=improved_score, method="alphabeta")
+        board = isolation.Board(agentUT, "null_agent")
+        for move in ((2, 3), (0, 5), (4, 4), (2, 4)):
+            board.apply_move(move)
+        results = list(itertools.islice(agentUT.iter_search(board), 4))
+        self.assertEqual([1, 2, 3, 4], [result.depth for result in results])
+        agentUT.time_left = lambda: 1e4
+        for result in results:
+            self.assertEqual(agentUT.alphabeta(board, result.depth), (result.score, result.move))
+        self.assertEqual(sorted(result.nodes for result in results), [result.nodes for result in results])
+
+        # without a clock, durations are still measured, so the time manager
+        # keeps deepening and the statistics hold finite times
+        import math
+        from search_stats import SearchStats
+        from time_manager import TimeManager
+        stats = SearchStats("agentUT")
+        agentUT = game_agent.CustomPlayer(score_fn=improved_score, method="alphabeta",
+                                          time_manager=TimeManager(), stats=stats)
+        board = isolation.Board(agentUT, "null_agent")
+        for move in ((2, 3), (0, 5), (4, 4), (2, 4)):
+            board.apply_move(move)
+        results = list(itertools.islice(agentUT.iter_search(board), 4))
+        self.assertEqual([1, 2, 3, 4], [result.depth for result in results])
+        self.assertEqual(1, len(stats.records))
+        for elapsed in [stats.records[0]["time"]] + stats.records[0]["iteration_times"]:
+            self.assertTrue(math.isfinite(elapsed))
+
+        reported = []
+
+        def stop_at_depth_2(result):
+            reported.append(result.depth)
+            return result.depth >= 2
+
+        agentUT = game_agent.CustomPlayer(score_fn=improved_score, method="alphabeta",
+                                          on_iteration=stop_at_depth_2)
+        board = isolation.Board(agentUT, "null_agent")
+        for move in ((2, 3), (0, 5), (4, 4), (2, 4)):
+            board.apply_move(move)
+        self.assertIn(agentUT.get_move(board, board.get_legal_moves(), lambda: 1e4), board.get_legal_moves())
+        self.assertEqual([1, 2], reported)
+
+        # an exhausted game tree ends the search
+        board = isolation.Board(agentUT, "null_agent", 3, 3)
+        board.apply_move((0, 0))
+        board.apply_move((2, 2))
+        results = list(agentUT.iter_search(board))
+        self.assertTrue(results)
+        self.assertLessEqual(results[-1].depth, len(board.get_blank_spaces()))
+
+    def test_parallel_tournament(self):
+        """ Test that agents survive pickling and that a round played by a
+        pool of workers gives the results of the sequential round """
+        import pickle
+        import tournament
+        from sample_players import GreedyPlayer, improved_score
+        from search_stats import SearchStats
+        stats = SearchStats("agentUT")
+        agentUT = game_agent.CustomPlayer(2, improved_score, False, "alphabeta", ponder=True, stats=stats)
+        board = isolation.Board(agentUT, "null_agent")
+        playRandomMoves(board, 2)
+        move = agentUT.get_move(board, board.get_legal_moves(), lambda: 1e4)
+        agentUT.close()
+        copy = pickle.loads(pickle.dumps(agentUT))
+        self.assertEqual(len(stats.records), len(copy.stats.records))
+        board = isolation.Board(copy, "null_agent")
+        playRandomMoves(board, 2)
+        self.assertIn(copy.get_move(board, board.get_legal_moves(), lambda: 1e4), board.get_legal_moves())
+        copy.close()
+        self.assertEqual(len(stats.records) + 1, len(copy.stats.records))
+
+        agents = [tournament.Agent(GreedyPlayer(), "Greedy"),
+                  tournament.Agent(game_agent.CustomPlayer(2, improved_score, False, "alphabeta",
+                                                           stats=SearchStats("agentUT")), "agentUT")]
+        results = []
+        for pool in (None, tournament.make_pool(2)):
+            results.append((tournament.play_round(agents, 2, pool=pool),
+                            len(agents[1].player.stats.records)))
+            if pool is not None:
+                pool.terminate()
+        # the workers' statistics are merged into the original agent
+        self.assertEqual((results[0][0], 2 * results[0][1]), results[1])
+
+    def test_resume_tournament(self):
+        """ Test that a resumed round only plays the matches missing from the
+        results log, including after a partially written record, and that
+        the log is protected from being overwritten or resumed with another
+        configuration """
+        import json
+        import os
+        import tempfile
+        import tournament
+        from sample_players import GreedyPlayer, improved_score
+        agents = [tournament.Agent(GreedyPlayer(), "Greedy"),
+                  tournament.Agent(game_agent.CustomPlayer(2, improved_score, False, "alphabeta"), "agentUT")]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "results.jsonl")
+            log = tournament.ResultsLog(path, config={"seed": 0})
+            result = tournament.play_round(agents, 2, log=log)
+            log.close()
+            with open(path) as f:
+                records = [json.loads(line) for line in f]
+            self.assertEqual({"config": {"seed": 0}}, records[0])
+            self.assertEqual(5, len(records))
+            self.assertEqual(2, len(records[1]["games"]))
+            self.assertEqual(records[1]["games"][0]["opening"], records[1]["games"][1]["opening"])
+            with self.assertRaises(FileExistsError):
+                tournament.ResultsLog(path, config={"seed": 0})
+            with self.assertRaises(ValueError):
+                tournament.ResultsLog(path, resume=True, config={"seed": 1})
+
+            # drop the last record and cut the one before it short
+            with open(path) as f:
+                lines = f.readlines()
+            with open(path, "w") as f:
+                f.writelines(lines[:3] + [lines[3][:20]])
+
+            log = tournament.ResultsLog(path, resume=True, config={"seed": 0})
+            self.assertEqual(2, len(log.completed))
+            self.assertEqual(result, tournament.play_round(agents, 2, log=log))
+            log.close()
+            with open(path) as f:
+                self.assertEqual(records, [json.loads(line) for line in f])
+
+    def test_sprt(self):
+        """ Test the Elo estimates and that the SPRT stops a round early
+        once the stronger agent is established """
+        import tournament
+        from elo import H0, H1, SPRT, elo_interval
+        from sample_players import RandomPlayer, improved_score
+        elo, low, high = elo_interval(20, 20)
+        self.assertAlmostEqual(0., elo)
+        self.assertAlmostEqual(-low, high)
+        elo, low, high = elo_interval(10, 0)
+        self.assertEqual(float("inf"), elo)
+        self.assertEqual(float("inf"), high)
+        self.assertGreater(low, 0.)
+
+        sprt = SPRT(elo0=0., elo1=100.)
+        self.assertEqual(H1, sprt.status(30, 10))
+        self.assertEqual(H0, sprt.status(0, 10))
+        self.assertIsNone(sprt.status(14, 6))
+
+        agents = [tournament.Agent(RandomPlayer(), "Random"),
+                  tournament.Agent(game_agent.CustomPlayer(2, improved_score, False, "alphabeta"), "agentUT")]
+        result = tournament.play_round(agents, 20, sprt=SPRT(elo0=0., elo1=100.))
+        self.assertLess(result.wins + result.losses, 80)
+        self.assertEqual(H1, SPRT(elo0=0., elo1=100.).status(result.wins, result.losses))
+
+    def test_opening_suite(self):
+        """ Test that the opening suite holds one balanced opening per
+        symmetry class and that tournament matches start from its openings """
+        import os
+        import tempfile
+        import tournament
+        from opening_suite import canonical, evaluate_opening, generate_suite, load_suite, save_suite
+        from sample_players import GreedyPlayer, improved_score
+        self.assertEqual(canonical(((0, 1), (3, 3))), canonical(((6, 5), (3, 3))))
+        self.assertEqual(canonical(((0, 1), (3, 3))), canonical(((1, 0), (3, 3))))
+        self.assertNotEqual(canonical(((0, 0), (3, 3))), canonical(((0, 1), (3, 3))))
+        self.assertEqual(canonical(((0, 1), (2, 3)), 5, 4), canonical(((3, 3), (1, 1)), 5, 4))
+
+        openings = generate_suite(count=5, depths=(1, 2), width=5, height=4)
+        self.assertEqual(5, len(openings))
+        self.assertEqual(len(openings), len({canonical(opening, 5, 4) for opening in openings}))
+        imbalances = [abs(evaluate_opening(opening, (1, 2), 5, 4) - 0.5) for opening in openings]
+        self.assertEqual(sorted(imbalances), imbalances)
+        self.assertLessEqual(imbalances[-1], abs(evaluate_opening(((0, 0), (3, 4)), (1, 2), 5, 4) - 0.5))
+
+        openings = [((2, 3), (0, 5)), ((3, 3), (1, 2))]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "openings.txt")
+            save_suite(openings, path, "test suite")
+            self.assertEqual(openings, load_suite(path))
+            log = tournament.ResultsLog(os.path.join(directory, "results.jsonl"))
+            agents = [tournament.Agent(GreedyPlayer(), "Greedy"),
+                      tournament.Agent(game_agent.CustomPlayer(2, improved_score, False, "alphabeta"), "agentUT")]
+            tournament.play_round(agents, 2, log=log, openings=openings)
+            log.close()
+        played = [tuple(tuple(move) for move in record["games"][0]["opening"])
+                  for record in log.completed.values()]
+        self.assertEqual(openings * 2, played)
+
+    def test_node_budget(self):
+        """ Test that searches with a node or iteration budget stop after
+        the budget regardless of the clock and give reproducible moves """
+        from mcts_player import MCTSPlayer
+        from sample_players import improved_score
+        moves = []
+        for time_left in (lambda: 0., lambda: float("inf")):
+            agentUT = game_agent.CustomPlayer(score_fn=improved_score, method="alphabeta", node_budget=500)
+            board = isolation.Board(agentUT, "null_agent")
+            for move in ((2, 3), (0, 5), (4, 4), (2, 4)):
+                board.apply_move(move)
+            moves.append(agentUT.get_move(board, board.get_legal_moves(), time_left))
+            self.assertEqual(501, agentUT.nodes_searched)
+        self.assertEqual(moves[0], moves[1])
+        with self.assertRaises(ValueError):
+            game_agent.CustomPlayer(node_budget=500, processes=2)
+
+        # the endgame solver's nodes count against the budget
+        agentUT = game_agent.CustomPlayer(score_fn=improved_score, method="alphabeta", node_budget=500,
+                                          endgame=True)
+        board = isolation.Board(agentUT, "null_agent", 5, 5)
+        state = [[0] * 5 for _ in range(5)]
+        for row, col in ((0, 0), (2, 1), (2, 0), (3, 1), (3, 3), (2, 4), (0, 4)):
+            state[row][col] = 1
+        state[4][4] = 2
+        board.__board_state__ = state
+        board.__last_player_move__ = {agentUT: (0, 0), "null_agent": (4, 4)}
+        self.assertEqual((1, 2), agentUT.get_move(board, board.get_legal_moves(), lambda: float("inf")))
+        self.assertEqual(1, agentUT.endgame_solutions)
+        self.assertEqual(500 - agentUT.endgame.nodes, agentUT.deadline.remaining())
+
+        # an unclocked game still exports finite search times
+        import json
+        import math
+        import os
+        import tempfile
+        import tournament
+        from sample_players import GreedyPlayer
+        from search_stats import SearchStats, export_jsonl
+        stats = SearchStats("agentUT")
+        agents = [tournament.Agent(GreedyPlayer(), "Greedy"),
+                  tournament.Agent(game_agent.CustomPlayer(score_fn=improved_score, method="alphabeta",
+                                                           node_budget=200, stats=stats), "agentUT")]
+        tournament.play_round(agents, 1, time_limit=float("inf"))
+        self.assertTrue(stats.records)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "stats.jsonl")
+            export_jsonl(stats.records, path)
+            with open(path) as f:
+                records = [json.loads(line) for line in f]
+        for record in records:
+            for elapsed in [record["time"]] + record["iteration_times"]:
+                self.assertTrue(math.isfinite(elapsed))
+
+        agentUT = MCTSPlayer(iteration_budget=50)
+        board = isolation.Board(agentUT, "null_agent")
+        for move in ((2, 3), (0, 5)):
+            board.apply_move(move)
+        self.assertIn(agentUT.get_move(board, board.get_legal_moves(), lambda: 0.), board.get_legal_moves())
+        self.assertEqual(50, agentUT.iterations)
+
+    def test_spsa_tuner(self):
+        """ Test that SPSA moves the weights towards the perturbation that
+        wins and that its state round-trips through a checkpoint """
+        import json
+        import os
+        import tempfile
+        from tune import SPSATuner, save_checkpoint, load_weights
+
+        def plus_wins(play_pair, tasks):
+            return [(2, 0) for _ in tasks]
+
+        tuner = SPSATuner({"own_moves": 1., "opp_moves": -1.}, matches=3)
+        stats = tuner.step(plus_wins)
+        self.assertEqual(6, stats["wins_plus"])
+        for name, value in stats["plus"].items():
+            self.assertGreater(abs(tuner.weights[name] - stats["minus"][name]),
+                               abs(tuner.weights[name] - value))
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "checkpoint.json")
+            save_checkpoint(tuner, path)
+            self.assertEqual(tuner.weights, load_weights(path))
+            with open(path) as f:
+                resumed = SPSATuner.from_state(json.load(f))
+        self.assertEqual(1, resumed.generation)
+        tuner.step(plus_wins)
+        resumed.step(plus_wins)
+        self.assertEqual(tuner.weights, resumed.weights)
+
+    def test_search_stats(self):
+        """ Test that the statistics collector records every search and
+        exports its records """
+        import csv
+        import json
+        import os
+        import tempfile
+        from sample_players import improved_score
+        from search_stats import SearchStats, export_csv, export_jsonl
+        stats = SearchStats("agentUT")
+        agentUT = game_agent.CustomPlayer(3, improved_score, False, "alphabeta", stats=stats)
+        board = isolation.Board(agentUT, "null_agent")
+        for move in ((2, 3), (0, 5), (4, 4), (2, 4)):
+            board.apply_move(move)
+        for _ in range(2):
+            agentUT.get_move(board, board.get_legal_moves(), lambda: 1e4)
+        self.assertEqual(2, len(stats.records))
+        record = stats.records[0]
+        self.assertEqual(3, record["depth"])
+        self.assertEqual(agentUT.nodes_searched, 2 * record["nodes"])
+        self.assertGreater(record["leaf_evaluations"], 0)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "stats.jsonl")
+            export_jsonl(stats.records, path)
+            with open(path) as f:
+                self.assertEqual(stats.records, [json.loads(line) for line in f])
+            path = os.path.join(directory, "stats.csv")
+            export_csv(stats.records, path)
+            with open(path) as f:
+                self.assertEqual(2, len(list(csv.DictReader(f))))
+
 
 if __name__ == '__main__':
     unittest.main()
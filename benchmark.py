@@ -0,0 +1,196 @@
+"""Estimate the speedup of the search options of `CustomPlayer` on a fixed set
+of positions.
+
+The parallel benchmark searches every position to a fixed depth, once with a
+single process and once with the root moves split between `--processes`
+worker processes, and reports the wall-clock speedup. Both agents use the
+same evaluation function and search method, so any difference in the chosen
+moves comes from ties between root moves.
+
+The clock benchmark measures the search speed in nodes per second when the
+deadline is tested by calling `time_left()` at every node and when the clock
+is only read every few nodes (see `deadline.py`). `time_left` is built as in
+`Board.play()`. Both agents search in place on bitboards, the fastest search
+configuration, so that the cost of the clock is not hidden behind the cost
+of copying boards.
+"""
+
+import argparse
+import random
+import time
+import timeit
+
+from isolation import BitBoard
+from isolation import Board
+from game_agent import CustomPlayer
+from sample_players import RandomPlayer
+from sample_players import improved_score
+
+NUM_POSITIONS = 10
+OPENING_PLIES = 6
+SEED = 20170201
+
+
+def benchmark_positions(num_positions=NUM_POSITIONS, plies=OPENING_PLIES, seed=SEED):
+    """Return a fixed list of positions reached by random openings.
+
+    Parameters
+    ----------
+    num_positions : int (optional)
+        The number of positions
+
+    plies : int (optional)
+        The number of random moves played from the empty board
+
+    seed : int (optional)
+        The random seed; the same seed always produces the same positions
+
+    Returns
+    -------
+    list<list>
+        A list of move sequences, each leading to a position where the game
+        is not over
+    """
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < num_positions:
+        game = Board("player_1", "player_2")
+        history = []
+        for _ in range(plies):
+            moves = game.get_legal_moves()
+            if not moves:
+                break
+            move = rng.choice(moves)
+            game.apply_move(move)
+            history.append(move)
+        if len(history) == plies and game.get_legal_moves():
+            positions.append(history)
+    return positions
+
+
+def time_to_depth(agent, positions, depth):
+    """Return the total time taken by an agent to search every position to
+    a fixed depth, and the moves it chose.
+    """
+    agent.search_depth = depth
+    agent.iterative = False
+    opponent = RandomPlayer()
+    moves = []
+    start = time.perf_counter()
+    for history in positions:
+        game = Board(agent, opponent) if len(history) % 2 == 0 else Board(opponent, agent)
+        for move in history:
+            game.apply_move(move)
+        moves.append(agent.get_move(game, game.get_legal_moves(), lambda: float("inf")))
+    return time.perf_counter() - start, moves
+
+
+def parallel_speedup(processes, depth, positions):
+    """Compare the time to search the positions with one and with several
+    processes.
+
+    Returns
+    -------
+    dict
+        The single-process and parallel times, the speedup and the number of
+        positions where both searches chose the same move
+    """
+    # the workers search on bitboards, so the single process agent does too
+    serial = CustomPlayer(score_fn=improved_score, method='alphabeta', engine=BitBoard)
+    parallel = CustomPlayer(score_fn=improved_score, method='alphabeta', processes=processes)
+    try:
+        # start the workers before timing the search
+        time_to_depth(parallel, positions[:1], 1)
+        serial_time, serial_moves = time_to_depth(serial, positions, depth)
+        parallel_time, parallel_moves = time_to_depth(parallel, positions, depth)
+    finally:
+        parallel.close()
+    return {"processes": processes,
+            "depth": depth,
+            "positions": len(positions),
+            "serial_time": serial_time,
+            "parallel_time": parallel_time,
+            "speedup": serial_time / parallel_time,
+            "same_move": sum(a == b for a, b in zip(serial_moves, parallel_moves))}
+
+
+def play_timer(time_limit):
+    """Return a `time_left` function built as in `Board.play()`."""
+    time_millis = lambda: 1000 * timeit.default_timer()
+    move_start = time_millis()
+    return lambda: time_limit - (time_millis() - move_start)
+
+
+def clock_check_rate(depth, positions):
+    """Compare the search speed with per-node and amortized deadline checks.
+
+    Returns
+    -------
+    dict
+        The nodes per second of both searches and their ratio
+    """
+    agents = {amortize_clock: CustomPlayer(score_fn=improved_score, method='alphabeta', iterative=False,
+                                           search_depth=depth, engine=BitBoard, inplace=True,
+                                           amortize_clock=amortize_clock)
+              for amortize_clock in (False, True)}
+    opponent = RandomPlayer()
+
+    def search(agent, history):
+        game = Board(agent, opponent) if len(history) % 2 == 0 else Board(opponent, agent)
+        for move in history:
+            game.apply_move(move)
+        start_nodes = agent.nodes_searched
+        start = time.perf_counter()
+        agent.get_move(game, game.get_legal_moves(), play_timer(float("inf")))
+        return agent.nodes_searched - start_nodes, time.perf_counter() - start
+
+    # warm up the lookup tables of the board before timing, and alternate
+    # the agents position by position so that both see the same conditions
+    for agent in agents.values():
+        search(agent, positions[0])
+    nodes = dict.fromkeys(agents, 0)
+    elapsed = dict.fromkeys(agents, 0.)
+    for history in positions:
+        for amortize_clock, agent in agents.items():
+            searched, seconds = search(agent, history)
+            nodes[amortize_clock] += searched
+            elapsed[amortize_clock] += seconds
+    rates = {amortize_clock: nodes[amortize_clock] / elapsed[amortize_clock] for amortize_clock in agents}
+    return {"depth": depth,
+            "positions": len(positions),
+            "per_node_rate": rates[False],
+            "amortized_rate": rates[True],
+            "speedup": rates[True] / rates[False]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, default=4,
+                        help="number of worker processes of the parallel search")
+    parser.add_argument("--depth", type=int, default=5,
+                        help="search depth of every position")
+    parser.add_argument("--positions", type=int, default=NUM_POSITIONS,
+                        help="number of benchmark positions")
+    parser.add_argument("--benchmark", choices=["all", "parallel", "clock"], default="all",
+                        help="benchmark to run")
+    args = parser.parse_args()
+    positions = benchmark_positions(args.positions)
+
+    if args.benchmark in ("all", "parallel"):
+        result = parallel_speedup(args.processes, args.depth, positions)
+        print("Parallel search: {processes} processes, depth {depth}, {positions} positions".format(**result))
+        print("  single process: {serial_time:8.3f}s".format(**result))
+        print("  parallel:       {parallel_time:8.3f}s".format(**result))
+        print("  speedup:        {speedup:8.2f}x".format(**result))
+        print("  same move:      {same_move} / {positions}".format(**result))
+
+    if args.benchmark in ("all", "clock"):
+        result = clock_check_rate(args.depth, positions)
+        print("Deadline checks: depth {depth}, {positions} positions".format(**result))
+        print("  every node:     {per_node_rate:8.0f} nodes/s".format(**result))
+        print("  amortized:      {amortized_rate:8.0f} nodes/s".format(**result))
+        print("  speedup:        {speedup:8.2f}x".format(**result))
+
+
+if __name__ == "__main__":
+    main()
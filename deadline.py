@@ -0,0 +1,104 @@
+"""This file contains `Deadline`, which lets `CustomPlayer` test for the end of
+its turn without reading the clock at every node of the search, and
+`NodeBudget`, which ends the turn after a fixed number of nodes instead.
+
+The `time_left` callable supplied by `Board.play()` reads the clock through
+two nested lambdas at every node (`benchmark.py --benchmark clock` measures
+the cost in an in-place bitboard search, where it is most visible). A
+`Deadline` converts the time left into an absolute `time.monotonic()` instant
+once per turn and reads the clock only every `interval` nodes. The interval is
+recalibrated at every clock read from the measured node rate so that clock
+reads stay about `max_gap` milliseconds apart; the search therefore stops at
+most `max_gap` milliseconds (plus one node) after the deadline, which must be
+covered by the timer threshold.
+
+A `NodeBudget` has the same interface but ignores the clock, so that the
+result of a search does not depend on the speed or the load of the machine.
+"""
+
+import time
+
+
+class Deadline:
+    """The instant at which the search of the current turn must stop.
+
+    Parameters
+    ----------
+    max_gap : float (optional)
+        The target number of milliseconds between two clock reads
+    """
+
+    def __init__(self, max_gap=1.):
+        self.max_gap = max_gap
+        self.interval = 1
+        self.end = float("inf")
+        self._countdown = 1
+        self._last_read = time.monotonic()
+
+    def reset(self, time_left, threshold):
+        """Set the deadline for a new turn; the calibrated interval is kept.
+
+        Parameters
+        ----------
+        time_left : callable
+            A function that returns the number of milliseconds left in the
+            turn
+
+        threshold : float
+            The number of milliseconds left at the deadline
+        """
+        self._last_read = time.monotonic()
+        self.end = self._last_read + (time_left() - threshold) / 1000
+        self._countdown = self.interval
+
+    def expired(self):
+        """Test whether the deadline has passed; the clock is only read
+        every `interval` calls.
+
+        Returns
+        -------
+        bool
+            True if the clock was read and the deadline has passed
+        """
+        self._countdown -= 1
+        if self._countdown > 0:
+            return False
+        now = time.monotonic()
+        elapsed = 1000 * (now - self._last_read)
+        # aim at half the maximum gap, and at most double the interval per
+        # read, so that the node rate may vary between reads
+        if elapsed > 0:
+            target = int(self.interval * 0.5 * self.max_gap / elapsed)
+            self.interval = max(1, min(2 * self.interval, target))
+        else:
+            self.interval *= 2
+        self._countdown = self.interval
+        self._last_read = now
+        return now >= self.end
+
+
+class NodeBudget:
+    """A deadline reached after a fixed number of search nodes.
+
+    Parameters
+    ----------
+    nodes : int
+        The number of nodes searched per turn
+    """
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+        self._left = nodes
+
+    def reset(self, time_left, threshold):
+        """Restore the full budget for a new turn; the time is ignored."""
+        self._left = self.nodes
+
+    def remaining(self):
+        """Return the number of nodes left in the budget."""
+        return max(0, self._left)
+
+    def expired(self):
+        """Count a node and test whether the budget is spent."""
+        self._left -= 1
+        return self._left < 0
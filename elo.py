@@ -0,0 +1,120 @@
+"""This file contains the statistics used by `tournament.py` to compare agents:
+Elo rating differences with confidence intervals, and `SPRT`, a sequential
+probability ratio test that stops a pairing as soon as its outcome is
+statistically settled.
+
+Isolation games cannot be drawn, so every game is a Bernoulli trial won by
+the evaluated agent with some probability p, which corresponds to the Elo
+difference -400 log10(1 / p - 1). The SPRT compares the hypotheses H0: the
+difference is `elo0` and H1: the difference is `elo1`, and accepts one of them
+once the log-likelihood ratio of the results leaves the interval set by the
+error rates `alpha` (accepting H1 when H0 holds) and `beta` (accepting H0 when
+H1 holds). On average it needs far fewer games than a fixed-size test with
+the same error rates, in particular when the agents differ by much more or
+much less than the tested difference.
+"""
+
+import math
+
+from statistics import NormalDist
+
+# Outcomes of the test
+H0 = "H0"
+H1 = "H1"
+
+
+def elo_difference(score):
+    """Return the Elo difference corresponding to an expected score (the
+    fraction of games won) between 0 and 1.
+    """
+    if score <= 0.:
+        return float("-inf")
+    if score >= 1.:
+        return float("inf")
+    return -400. * math.log10(1. / score - 1.)
+
+
+def expected_score(elo):
+    """Return the expected score of a player rated `elo` points above its
+    opponent.
+    """
+    return 1. / (1. + 10. ** (-elo / 400.))
+
+
+def elo_interval(wins, losses, confidence=0.95):
+    """Estimate the Elo difference from game results.
+
+    Parameters
+    ----------
+    wins, losses : int
+        The number of games won and lost
+
+    confidence : float (optional)
+        The probability covered by the confidence interval
+
+    Returns
+    -------
+    (float, float, float)
+        The estimated Elo difference and the bounds of its confidence
+        interval, from the Wilson score interval of the score; when all the
+        games were won (lost), the lower (upper) bound stays finite
+    """
+    games = wins + losses
+    if not games:
+        return 0., float("-inf"), float("inf")
+    score = wins / games
+    z = NormalDist().inv_cdf(0.5 + confidence / 2.)
+    center = (score + z * z / (2. * games)) / (1. + z * z / games)
+    margin = z / (1. + z * z / games) * math.sqrt(score * (1. - score) / games + z * z / (4. * games * games))
+    low = elo_difference(center - margin) if wins else float("-inf")
+    high = elo_difference(center + margin) if losses else float("inf")
+    return elo_difference(score), low, high
+
+
+class SPRT:
+    """Sequential probability ratio test of the Elo difference between two
+    agents.
+
+    Parameters
+    ----------
+    elo0 : float (optional)
+        The Elo difference of the null hypothesis
+
+    elo1 : float (optional)
+        The Elo difference of the alternative hypothesis; larger than `elo0`
+
+    alpha : float (optional)
+        The probability of accepting H1 when H0 holds
+
+    beta : float (optional)
+        The probability of accepting H0 when H1 holds
+    """
+
+    def __init__(self, elo0=0., elo1=100., alpha=0.05, beta=0.05):
+        self.elo0 = elo0
+        self.elo1 = elo1
+        self.alpha = alpha
+        self.beta = beta
+        self.lower = math.log(beta / (1. - alpha))
+        self.upper = math.log((1. - beta) / alpha)
+        p0 = expected_score(elo0)
+        p1 = expected_score(elo1)
+        self._win_weight = math.log(p1 / p0)
+        self._loss_weight = math.log((1. - p1) / (1. - p0))
+
+    def llr(self, wins, losses):
+        """Return the log-likelihood ratio of H1 against H0 for the given
+        results.
+        """
+        return wins * self._win_weight + losses * self._loss_weight
+
+    def status(self, wins, losses):
+        """Return H1 or H0 if the results accept that hypothesis, and None
+        if more games are needed.
+        """
+        llr = self.llr(wins, losses)
+        if llr >= self.upper:
+            return H1
+        if llr <= self.lower:
+            return H0
+        return None
@@ -0,0 +1,204 @@
+"""This file contains the exact endgame solver used by `CustomPlayer` once the
+two players are partitioned, i.e., once no cell reachable by one player can
+ever be reached by the other.
+
+From then on the players no longer interact: each one can make as many moves
+as the longest knight's path through the blank cells of its own region, and
+the player to move wins exactly when its longest path is longer than the
+opponent's. Longest paths are found by depth-first search over bitmasks of
+the blank cells, with results memoized by (location, blank cells).
+"""
+
+from isolation import Board
+from isolation.bitboard import knight_tables
+
+
+def blank_mask(game):
+    """Return the blank cells of a game as a bitmask, numbering cells as in
+    `isolation.bitboard.knight_tables()`.
+    """
+    height = game.height
+    mask = 0
+    for row, col in game.get_blank_spaces():
+        mask |= 1 << (col * height + row)
+    return mask
+
+
+def reachable_mask(moves, location, free):
+    """Return the mask of the cells a knight at `location` can reach by any
+    sequence of moves through the cells of `free`.
+
+    Parameters
+    ----------
+    moves : dict
+        The knight move table returned by `knight_tables()`
+
+    location : (int, int)
+        The starting cell
+
+    free : int
+        The mask of the blank cells
+
+    Returns
+    -------
+    int
+        The mask of the reachable cells, excluding `location`
+    """
+    reached = 0
+    frontier = [location]
+    while frontier:
+        cell = frontier.pop()
+        for bit, target in moves[cell]:
+            if free & bit and not reached & bit:
+                reached |= bit
+                frontier.append(target)
+    return reached
+
+
+def partitioned(game):
+    """Test whether the players of a game can no longer reach any common
+    cell.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        The game state
+
+    Returns
+    -------
+    bool
+        True if both players have moved and their reachable regions are
+        disjoint, False otherwise
+    """
+    own = game.get_player_location(game.active_player)
+    other = game.get_player_location(game.inactive_player)
+    if own == Board.NOT_MOVED or other == Board.NOT_MOVED:
+        return False
+    _, moves, _ = knight_tables(game.width, game.height)
+    free = blank_mask(game)
+    return not reachable_mask(moves, own, free) & reachable_mask(moves, other, free)
+
+
+class EndgameSolver:
+    """Exact solver for partitioned positions.
+
+    Parameters
+    ----------
+    max_cells : int (optional)
+        The largest region searched exactly; `solve()` gives up on positions
+        where either player can reach more cells, since the search time grows
+        exponentially with the size of the region.
+    """
+
+    def __init__(self, max_cells=32):
+        self.max_cells = max_cells
+        self.memo = {}
+        self.nodes = 0
+
+    def clear(self):
+        """Forget the memoized path lengths (e.g., at the end of a game)."""
+        self.memo = {}
+
+    def longest_path(self, moves, location, free, check=None, target=None):
+        """Return the number of moves of the longest knight's path from
+        `location` through the cells of `free`.
+
+        Parameters
+        ----------
+        moves : dict
+            The knight move table returned by `knight_tables()`
+
+        location : (int, int)
+            The starting cell
+
+        free : int
+            The mask of the cells the path may visit
+
+        check : callable (optional)
+            Called at every node of the search; may raise an exception to
+            abort the search
+
+        target : int (optional)
+            Stop searching as soon as a path of this length is found
+
+        Returns
+        -------
+        int
+            The length of the longest path, or a length of at least `target`
+            when a path of `target` moves exists
+        """
+        free = reachable_mask(moves, location, free)
+        key = (location, free)
+        length, exact = self.memo.get(key, (0, False))
+        if exact or (target is not None and length >= target):
+            return length
+        self.nodes += 1
+        if check is not None:
+            check()
+
+        # no path can be longer than the number of reachable cells
+        bound = bin(free).count("1")
+        if target is None or target > bound:
+            target = bound
+        length = 0
+        for bit, next_location in moves[location]:
+            if free & bit:
+                length = max(length, 1 + self.longest_path(moves, next_location, free & ~bit,
+                                                           check, target - 1))
+                if length >= target:
+                    break
+        self.memo[key] = (length, length < target or length == bound)
+        return length
+
+    def solve(self, game, player, check=None):
+        """Solve a partitioned position with `player` to move.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            A partitioned game state (see `partitioned()`)
+
+        player : object
+            The player to move
+
+        check : callable (optional)
+            Called at every node of the search; may raise an exception to
+            abort the search
+
+        Returns
+        -------
+        (float, (int, int), int, int)
+            The game value for `player` (inf for a proven win, -inf for a
+            proven loss), the move to play, the length of the path it starts
+            and the length of the opponent's longest path; None if a region
+            is larger than `max_cells`. The search stops at the first path
+            that beats the opponent's, so a winning path need not be the
+            longest. The opponent's path is only searched up to the number of
+            cells `player` can reach, which no path of `player` can exceed, so
+            in a lost position its length may be a lower bound.
+        """
+        _, moves, _ = knight_tables(game.width, game.height)
+        free = blank_mask(game)
+        own = reachable_mask(moves, game.get_player_location(player), free)
+        opponent = game.get_opponent(player)
+        other = reachable_mask(moves, game.get_player_location(opponent), free)
+        if max(bin(own).count("1"), bin(other).count("1")) > self.max_cells:
+            return None
+
+        # a path one move longer than the opponent's is enough to win; when
+        # no move wins, play the longest path in case the opponent errs. The
+        # player cannot win against a path as long as its own region, so the
+        # opponent's search stops there
+        other_length = self.longest_path(moves, game.get_player_location(opponent), other, check,
+                                         bin(own).count("1"))
+        best_length, best_move = 0, (-1, -1)
+        for bit, location in moves[game.get_player_location(player)]:
+            if own & bit:
+                length = 1 + self.longest_path(moves, location, own & ~bit, check,
+                                               max(other_length, best_length))
+                if length > best_length:
+                    best_length, best_move = length, location
+                if best_length > other_length:
+                    break
+        value = float("inf") if best_length > other_length else float("-inf")
+        return value, best_move, best_length, other_length
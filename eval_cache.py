@@ -0,0 +1,70 @@
+"""This file contains `EvalCache`, a memoizing wrapper for the evaluation
+functions passed to `CustomPlayer` as `score_fn`.
+
+Iterative deepening evaluates most leaves of an iteration again in the next
+one, and transpositions reach the same leaf through different move orders.
+The cache stores the score of each (position, player) pair, keyed by the
+Zobrist key of the position (see `Board.hash_key`) and the symbol of the
+player, and evicts the least recently used entry once it is full.
+
+Only deterministic evaluation functions should be cached.
+"""
+
+from collections import OrderedDict
+
+
+class EvalCache:
+    """Memoize an evaluation function with least recently used eviction.
+
+    Parameters
+    ----------
+    score_fn : callable
+        The evaluation function, called as `score_fn(game, player)`
+
+    max_entries : int (optional)
+        The maximum number of scores kept
+    """
+
+    def __init__(self, score_fn, max_entries=2 ** 16):
+        self.score_fn = score_fn
+        self.max_entries = max_entries
+        self.__name__ = getattr(score_fn, "__name__", type(score_fn).__name__)
+        self.clear()
+
+    def __call__(self, game, player):
+        key = (game.hash_key, game.__player_symbols__[player])
+        entries = self.entries
+        score = entries.get(key)
+        if score is not None:
+            self.hits += 1
+            entries.move_to_end(key)
+            return score
+        self.misses += 1
+        score = self.score_fn(game, player)
+        entries[key] = score
+        if len(entries) > self.max_entries:
+            entries.popitem(last=False)
+        return score
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        """Remove all entries and reset the counters."""
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self):
+        """The fraction of calls answered from the cache."""
+        calls = self.hits + self.misses
+        return self.hits / calls if calls else 0.
+
+    def stats(self):
+        """Return the cache counters as a dict."""
+        return {"entries": len(self.entries),
+                "capacity": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hit_rate}
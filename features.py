@@ -0,0 +1,238 @@
+"""This file contains `FeatureEngine`, which builds evaluation functions from
+weighted board features computed together in a single pass.
+
+Heuristics written as separate functions each regenerate the legal moves of
+both players and test for the end of the game on their own, so combining them
+repeats the same work at every leaf. A `FeatureEngine` evaluates a board
+through a `FeatureContext` that computes each intermediate result (the legal
+moves of each player, the areas around them, ...) at most once and shares it
+between all the features that need it.
+
+Available features, all from the point of view of the evaluated player:
+
+- own_moves, opp_moves: the number of legal moves of the player and of the
+  opponent
+- own_area, opp_area: the number of blank cells in the 5x5 window centered
+  on the player and on the opponent, as in
+  `game_agent.free_spaces_around_player`; like that function, they are 10000
+  once the game is over
+- area_over_opp_mobility: own_area divided by opp_moves (or by 1 when the
+  opponent has no moves), as in
+  `game_agent.free_spaces_around_player_minus_length`
+- own_center_distance, opp_center_distance: the squared distance from the
+  player and from the opponent to the center of the board
+- own_second_moves, opp_second_moves: the number of moves available from
+  the destinations of the player's and the opponent's legal moves
+- partitioned: 1 if the players can no longer reach a common cell (see
+  `endgame.partitioned()`), 0 otherwise
+
+The heuristics of `sample_players.py` and `game_agent.py` are available as
+the engines below; they return the same scores as the original functions.
+
+`FeatureEngine.score_many()` scores all the successors of a position at once
+for searches that evaluate the children of a frontier node together (see
+`CustomPlayer(batch_leaves=True)`). Engines that only weigh the mobility
+features derive the scores of all the children from the legal moves of the
+parent, without making any of the moves.
+"""
+
+from endgame import partitioned
+
+# Value of the area features once the game is over
+TERMINAL_AREA = 10000.
+
+
+class FeatureContext:
+    """The features of one board from the point of view of one player,
+    computed on demand and cached.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        The game state
+
+    player : object
+        The player the features are computed for
+    """
+
+    def __init__(self, game, player):
+        self.game = game
+        self.player = player
+        self.opponent = game.get_opponent(player)
+        self._values = {}
+
+    def get(self, name):
+        """Return the value of a feature or intermediate result."""
+        values = self._values
+        if name not in values:
+            values[name] = _COMPUTE[name](self)
+        return values[name]
+
+    def is_loser(self):
+        """Test whether the player has lost, as `Board.is_loser()`."""
+        return self.game.active_player == self.player and not self.get("own_legal_moves")
+
+    def is_winner(self):
+        """Test whether the player has won, as `Board.is_winner()`."""
+        return self.game.active_player == self.opponent and not self.get("opp_legal_moves")
+
+    def is_over(self):
+        """Test whether the player to move has no legal moves."""
+        if self.game.active_player == self.player:
+            return not self.get("own_legal_moves")
+        return not self.get("opp_legal_moves")
+
+
+def _area(context, player):
+    if context.is_over():
+        return TERMINAL_AREA
+    game = context.game
+    x, y = game.get_player_location(player)
+    return float(game.count_blank_cells(max(0, x - 2), max(0, y - 2),
+                                        min(game.height - 1, x + 2), min(game.width - 1, y + 2)))
+
+
+def _center_distance(game, player):
+    location = game.get_player_location(player)
+    if location is None:
+        return 0.
+    row, col = location
+    return (row - (game.height - 1) / 2.) ** 2 + (col - (game.width - 1) / 2.) ** 2
+
+
+def _second_moves(game, moves):
+    return float(sum(len(game.__get_moves__(move)) for move in moves))
+
+
+_COMPUTE = {
+    "own_legal_moves": lambda c: c.game.get_legal_moves(c.player),
+    "opp_legal_moves": lambda c: c.game.get_legal_moves(c.opponent),
+    "own_moves": lambda c: float(len(c.get("own_legal_moves"))),
+    "opp_moves": lambda c: float(len(c.get("opp_legal_moves"))),
+    "own_area": lambda c: _area(c, c.player),
+    "opp_area": lambda c: _area(c, c.opponent),
+    "area_over_opp_mobility": lambda c: c.get("own_area") / (c.get("opp_moves") or 1.),
+    "own_center_distance": lambda c: _center_distance(c.game, c.player),
+    "opp_center_distance": lambda c: _center_distance(c.game, c.opponent),
+    "own_second_moves": lambda c: _second_moves(c.game, c.get("own_legal_moves")),
+    "opp_second_moves": lambda c: _second_moves(c.game, c.get("opp_legal_moves")),
+    "partitioned": lambda c: 1. if partitioned(c.game) else 0.,
+}
+
+FEATURES = [name for name in _COMPUTE if not name.endswith("_legal_moves")]
+
+# Features that score_many() computes without making the moves
+MOBILITY_FEATURES = {"own_moves", "opp_moves"}
+
+
+class FeatureEngine:
+    """Evaluation function computing a weighted sum of board features.
+
+    Parameters
+    ----------
+    weights : dict
+        The weight of each feature used, by feature name (see `FEATURES`)
+
+    win : float (optional)
+        The score of a won game; None evaluates finished games with the
+        features like any other position
+
+    loss : float (optional)
+        The score of a lost game; None evaluates finished games with the
+        features like any other position
+
+    name : str (optional)
+        The name of the evaluation function, e.g. for tournament reports
+    """
+
+    def __init__(self, weights, win=float("inf"), loss=float("-inf"), name="feature_score"):
+        unknown = set(weights) - set(FEATURES)
+        if unknown:
+            raise ValueError("Unknown features: {}".format(", ".join(sorted(unknown))))
+        self.weights = dict(weights)
+        self.win = win
+        self.loss = loss
+        self.__name__ = name
+
+    def __call__(self, game, player):
+        context = FeatureContext(game, player)
+        if self.loss is not None and context.is_loser():
+            return self.loss
+        if self.win is not None and context.is_winner():
+            return self.win
+        return float(sum(weight * context.get(name) for name, weight in self.weights.items()))
+
+    def score_many(self, game, moves, player):
+        """Return the scores of the successors of `game` reached by each of
+        the given moves of the active player, in the order of `moves`.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            The game state; moves are applied to it and undone, so it is
+            unchanged on return
+
+        moves : list<(int, int)>
+            Legal moves of the active player
+
+        player : object
+            The player the successors are evaluated for
+
+        Returns
+        -------
+        list<float>
+            The score of the successor reached by each move
+        """
+        if set(self.weights) <= MOBILITY_FEATURES:
+            return self._mobility_scores(game, moves, player)
+        scores = []
+        for move in moves:
+            game.apply_move(move)
+            scores.append(self(game, player))
+            game.undo_move()
+        return scores
+
+    def _mobility_scores(self, game, moves, player):
+        """Score the successors of `game` from the legal moves of `game`: a
+        player moving to `move` has the moves available from `move`, and the
+        waiting player loses `move` from its moves.
+        """
+        mover = game.active_player
+        waiting_moves = game.get_legal_moves(game.inactive_player)
+        if player == mover:
+            mover_weight = self.weights.get("own_moves", 0.)
+            waiting_weight = self.weights.get("opp_moves", 0.)
+            # the waiting player moves next in the successors and loses
+            # if it has no moves left
+            blocked_score = self.win
+        else:
+            mover_weight = self.weights.get("opp_moves", 0.)
+            waiting_weight = self.weights.get("own_moves", 0.)
+            blocked_score = self.loss
+        waiting_count = len(waiting_moves)
+        waiting = set(waiting_moves)
+        scores = []
+        for move in moves:
+            remaining = waiting_count - 1 if move in waiting else waiting_count
+            if not remaining and blocked_score is not None:
+                scores.append(blocked_score)
+            else:
+                scores.append(float(mover_weight * len(game.__get_moves__(move)) +
+                                    waiting_weight * remaining))
+        return scores
+
+    def features(self, game, player):
+        """Return the value of every feature for a player as a dict."""
+        context = FeatureContext(game, player)
+        return {name: context.get(name) for name in FEATURES}
+
+
+null_features = FeatureEngine({}, name="null_score")
+open_move_features = FeatureEngine({"own_moves": 1.}, name="open_move_score")
+improved_features = FeatureEngine({"own_moves": 1., "opp_moves": -1.}, name="improved_score")
+blank_features = FeatureEngine({"own_area": 1.}, win=None, loss=None,
+                               name="free_spaces_around_player")
+blank_improved_features = FeatureEngine({"own_area": 1., "opp_area": -1.}, win=None, loss=None,
+                                        name="free_spaces_around_player_improved")
+blank_minus_length_features = FeatureEngine({"area_over_opp_mobility": 1.}, win=None, loss=None,
+                                            name="free_spaces_around_player_minus_length")
@@ -6,8 +6,21 @@ augment the test suite with your own test cases to further test your code.
 You must test your agent's strength against a set of agents with known
 relative strength using tournament.py and include the results in your report.
 """
+import math
 import random
-from isolation import Board
+import time
+from collections import namedtuple
+from deadline import Deadline
+from deadline import NodeBudget
+from endgame import EndgameSolver
+from endgame import partitioned
+from parallel_search import PonderSearch
+from parallel_search import RootSplitSearch
+from transposition import EXACT, LOWER, UPPER
+from transposition import MOVE
+from transposition import PERSPECTIVE_KEY
+from transposition import TranspositionTable
+from transposition import bound_type
 
 
 def custom_score(game, player):
@@ -46,16 +59,10 @@ def free_spaces_around_player(game, player):
     if game.is_winner(player):
         return 10000.0
     (x, y) = game.get_player_location(player)
-    # print ("coordinates: {},{}".format(x,y))
-    # topleft, bottomright
-    corners = [(max(0, min(6, x + x1)), max(0, min(6, y + y1))) for (x1, y1) in [(-2, -2), (2, 2)]]
-    # print("Corners: {}".format(corners))
-    area_to_check = [(row, col) for row in range(corners[0][0], corners[1][0] + 1)
-                     for col in range(corners[0][1], corners[1][1] + 1)]
-    # print("area_to_check: {}".format(area_to_check))
-    val = float(len([(row, col) for (row, col) in area_to_check if game.__board_state__[row][col] == Board.BLANK]))
-    # print(val)
-    return val
+    # count the blank cells of the 5x5 window centered on the player,
+    # clipped to the board
+    return float(game.count_blank_cells(max(0, x - 2), max(0, y - 2),
+                                        min(game.height - 1, x + 2), min(game.width - 1, y + 2)))
 
 
 def free_spaces_around_player_improved(game, player):
@@ -77,11 +84,30 @@ def free_spaces_around_player_minus_length(game, player):
     return score_p1 / score_p2
 
 
+def _millis_since(start):
+    """Return the number of milliseconds elapsed since the
+    `time.perf_counter()` reading `start`. Durations are measured on this
+    clock rather than as differences of `time_left()`, which may be
+    unlimited.
+    """
+    return 1000 * (time.perf_counter() - start)
+
+
 class Timeout(Exception):
     """Subclass base exception for code clarity."""
     pass
 
 
+# A root move ranked by `CustomPlayer.analyse()`: its score, the principal
+# variation starting with the move and the depth of the search
+AnalysisLine = namedtuple("AnalysisLine", ["move", "score", "pv", "depth"])
+
+# The result of a completed iteration of the search run by
+# `CustomPlayer.iter_search()` or get_move(); `nodes` counts the nodes
+# searched since the start of the search
+SearchResult = namedtuple("SearchResult", ["depth", "score", "move", "nodes"])
+
+
 class CustomPlayer:
     """Game-playing agent that chooses a move using your evaluation function
     and a depth-limited minimax algorithm with alpha-beta pruning. You must
@@ -103,33 +129,169 @@ class CustomPlayer:
         Flag indicating whether to perform fixed-depth search (False) or
         iterative deepening search (True).
 
-    method : {'minimax', 'alphabeta'} (optional)
-        The name of the search method to use in get_move().
+    method : {'minimax', 'alphabeta', 'pvs'} (optional)
+        The name of the search method to use in get_move(); 'pvs' selects
+        principal variation search (alpha-beta with null-window searches of
+        all but the first move of each node).
 
     timeout : float (optional)
         Time remaining (in milliseconds) when search is aborted. Should be a
         positive value large enough to allow the function to return before the
         timer expires.
+
+    engine : class (optional)
+        A board class such as `isolation.BitBoard` used for searching. When
+        set, the game passed to get_move() is converted with
+        `engine.from_board()` before the search starts; when None, the search
+        runs on the board class supplied by the caller.
+
+    inplace : boolean (optional)
+        Flag indicating whether the search walks the game tree in place with
+        `Board.apply_move()` and `Board.undo_move()` (True) instead of creating
+        a copy of the board for every node with `Board.forecast_move()`
+        (False). In-place search runs on a private copy of the game made once
+        per call to get_move().
+
+    tt_size : int (optional)
+        The maximum number of entries in the transposition table used by
+        alphabeta search; 0 disables the table. The table is kept between
+        iterations and between moves.
+
+    move_orderer : object (optional)
+        A move ordering policy for alphabeta search such as
+        `move_ordering.MoveOrderer`; when None, moves are searched in the
+        order returned by `Board.get_legal_moves()`.
+
+    aspiration_window : float (optional)
+        Half-width of the aspiration window used by iterative deepening with
+        alphabeta or pvs search: each iteration after the first searches the
+        window centered on the score of the previous iteration, and repeats
+        the search with a full window if the score falls outside of it. None
+        disables aspiration windows.
+
+    ponder : boolean (optional)
+        Flag indicating whether to keep searching in a worker process while
+        the opponent is thinking (see `parallel_search.py`). After each move
+        the agent predicts the opponent's reply and searches the resulting
+        position until the opponent moves (see `opponent_moved()`); if the
+        prediction was right, the next search starts after the deepest
+        iteration completed by the worker. The worker's transposition table
+        entries (except those next to the leaves) are loaded into the
+        agent's table when pondering stops, so that the next search reuses
+        its results and move ordering. The reply is also predicted from the
+        transposition table, so a default-sized table is created when
+        `tt_size` is 0. Like `processes`, this requires `score_fn` and
+        `move_orderer` to be picklable. Call `close()` to stop the worker.
+
+    processes : int (optional)
+        The number of worker processes searching in parallel. With more than
+        one process the root moves are split between the workers of a
+        `multiprocessing` pool (see `parallel_search.py`), which requires
+        `score_fn` and `move_orderer` to be picklable. Call `close()` to stop
+        the workers.
+
+    endgame : boolean (optional)
+        Flag indicating whether to solve positions exactly once the players
+        are partitioned (see `endgame.py`). The solver gets half of the time
+        left in the turn; if it cannot finish, the regular search runs with
+        the remaining time.
+
+    time_manager : object (optional)
+        An object deciding whether iterative deepening starts each iteration,
+        such as `time_manager.TimeManager`; None runs iterations until the
+        search times out.
+
+    amortize_clock : boolean (optional)
+        Flag indicating whether to read the clock only every few nodes
+        through a `deadline.Deadline` instead of calling `time_left()` at
+        every node. The interval is calibrated so that clock reads are about
+        a millisecond apart, which the timer threshold must cover.
+
+    stats : `search_stats.SearchStats` (optional)
+        A collector receiving one record of statistics per call to
+        get_move(); None disables the bookkeeping.
+
+    batch_leaves : boolean (optional)
+        Flag indicating whether to evaluate all the children of a node at
+        the last ply of the search together, with the `score_many(game,
+        moves, player)` method of `score_fn` (see
+        `features.FeatureEngine.score_many()`). Alphabeta then scores every
+        child of a frontier node even when the first ones cause a cutoff.
+        Ignored when `score_fn` has no `score_many` method.
+
+    on_iteration : callable (optional)
+        A function called by get_move() with the `SearchResult` of every
+        completed iteration; when it returns a true value the search stops
+        and returns the move of that iteration.
+
+    node_budget : int (optional)
+        The number of nodes searched per call to get_move(). When set, the
+        search stops once the budget is spent instead of when the time runs
+        out (see `deadline.NodeBudget`), so that its result does not depend
+        on the speed of the machine; the caller must allow enough time for
+        the budget to be spent. Overrides `amortize_clock`. The root-split
+        search does not count nodes, so a budget cannot be combined with
+        more than one process.
     """
 
     def __init__(self, search_depth=3, score_fn=custom_score,
-                 iterative=True, method='minimax', timeout=10.):
+                 iterative=True, method='minimax', timeout=10., engine=None,
+                 inplace=False, tt_size=0, move_orderer=None,
+                 aspiration_window=None, ponder=False, processes=1,
+                 endgame=False, time_manager=None,
+                 amortize_clock=False, stats=None, batch_leaves=False,
+                 on_iteration=None, node_budget=None):
+        if node_budget is not None and processes > 1:
+            raise ValueError("node_budget cannot be combined with processes > 1")
         self.search_depth = search_depth
         self.iterative = iterative
         self.score = score_fn
+        self.score_fn = score_fn
         self.method = method
         self.time_left = None
         self.TIMER_THRESHOLD = timeout
+        self.engine = engine
+        self.inplace = inplace
+        self.tt = TranspositionTable(tt_size) if tt_size else None
+        self.move_orderer = move_orderer
+        self.aspiration_window = aspiration_window
+        self.ponder = ponder
+        if ponder and self.tt is None:
+            self.tt = TranspositionTable()
+        self.ponder_hits = 0
+        self.ponder_misses = 0
+        self._ponder_key = None
+        self._ponder_result = None
+        self.endgame = EndgameSolver() if endgame else None
+        self.time_manager = time_manager
+        if node_budget is not None:
+            self.deadline = NodeBudget(node_budget)
+        else:
+            self.deadline = Deadline() if amortize_clock else None
+        self._deadline = None
+        self.nodes_searched = 0
+        self.cutoffs = 0
+        self.stats = stats
+        if stats is not None:
+            self.score = stats.counting(score_fn)
+        self.score_many = getattr(score_fn, "score_many", None) if batch_leaves else None
+        self.on_iteration = on_iteration
+        self.endgame_solutions = 0
+        config = dict(search_depth=search_depth, score_fn=score_fn, iterative=iterative,
+                      method=method, inplace=inplace, tt_size=tt_size, move_orderer=move_orderer,
+                      batch_leaves=batch_leaves)
+        self.parallel = None
+        if processes > 1:
+            self.parallel = RootSplitSearch(processes, config)
+        self.pondering = None
+        if ponder:
+            self.pondering = PonderSearch(dict(config, tt_size=tt_size or 2 ** 16))
         if method == 'minimax':
             self.search_method = self.minimax
         elif method == 'alphabeta':
             self.search_method = self.alphabeta
-            # print("CustomPlayer[iterative: {}, method: {}, timeout: {}, search_depth: {}, score_fn: {}]".format(
-            #     iterative, method, timeout, search_depth, score_fn
-            # ))
-        filename = "depth/{}_{}_{}.txt".format(score_fn.__name__, method, iterative)
-        print(filename)
-        self.file_log = open(filename, 'a')
+        elif method == 'pvs':
+            self.search_method = self.pvs
 
     def get_move(self, game, legal_moves, time_left):
         """Search for the best move from the available legal moves and return a
@@ -167,7 +329,11 @@ class CustomPlayer:
             (-1, -1) if there are no available legal moves.
         """
 
+        self._stop_pondering()
         self.time_left = time_left
+        self._deadline = self.deadline
+        if self._deadline is not None:
+            self._deadline.reset(time_left, self.TIMER_THRESHOLD)
 
         # Perform any required initializations, including selecting an initial
         # move from the game board (i.e., an opening book), or returning
@@ -175,32 +341,427 @@ class CustomPlayer:
         if not legal_moves or not game.get_legal_moves():
             return -1, -1
 
+        if self.engine is not None and not isinstance(game, self.engine):
+            game = self.engine.from_board(game)
+        if self.endgame is not None and partitioned(game):
+            solution = self._solve_endgame(game)
+            if solution is not None:
+                return solution
+
+        if self.pondering is not None:
+            self.pondering.open()
+        search_game = self._start_search(game)
+
         move = -1, -1
-        i = 1
+        if self.stats is not None:
+            search_start = time.perf_counter()
+            self.stats.start_search(game, legal_moves, self.nodes_searched, self.cutoffs)
+
+        first_depth, score = 1, None
+        if self._ponder_result is not None:
+            ponder_key, ponder_result = self._ponder_key, self._ponder_result
+            self._ponder_result = None
+            if ponder_key == self._position_key(game):
+                self.ponder_hits += 1
+                move = ponder_result.move
+                if self.iterative:
+                    first_depth, score = ponder_result.depth + 1, ponder_result.score
+            else:
+                self.ponder_misses += 1
 
         try:
             # The search method call (alpha beta or minimax) should happen in
             # here in order to avoid timeout. The try/except block will
             # automatically catch the exception raised by the search method
             # when the timer gets close to expiring
-            if self.iterative:
-                while True:
-                    score, move = self.search_method(game, i)
-                    i += 1
+            if self.parallel is not None:
+                depths = range(1, len(game.get_blank_spaces()) + 1) if self.iterative else [self.search_depth]
+                score, move = self.parallel.search(search_game, self, time_left, self.TIMER_THRESHOLD,
+                                                   list(depths))
             else:
-                score, move = self.search_method(game, self.search_depth)
+                for result in self._iterations(search_game, first_depth, score):
+                    move = result.move
+                    if self.on_iteration is not None and self.on_iteration(result):
+                        break
 
         except Timeout:
             # print("Got depth {}".format(i))
             # Handle any actions required at timeout, if necessary
-            self.file_log.write("{}\n".format(i))
-            self.file_log.flush()
             pass
 
+        if self.stats is not None:
+            self.stats.end_search(_millis_since(search_start), self.nodes_searched, self.cutoffs)
+
+        if self.ponder and move != (-1, -1):
+            self._start_pondering(game, move)
+
         # Return the best move from the last completed search iteration
         return move
 
-    indent = ""
+    def analyse(self, game, k=3, depth=None, time_left=None):
+        """Rank the best `k` moves of the active player with their scores and
+        principal variations.
+
+        Iterative deepening searches every root move in each iteration, in
+        the order of the previous ranking. Once `k` moves have been scored,
+        the remaining moves are searched with a window whose lower bound is
+        the k-th best score, so moves that cannot enter the ranking are cut
+        off early. All the searches share the transposition table, from
+        which the principal variations are read; a private table is used
+        when the agent has none. Minimax agents are analysed with alphabeta,
+        which finds the same scores.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            The game state to analyse, with this agent as one of the players
+
+        k : int (optional)
+            The number of moves ranked
+
+        depth : int (optional)
+            The depth of the last iteration; None searches until the time
+            runs out or the game tree is exhausted, or to `search_depth`
+            when `time_left` is None
+
+        time_left : callable (optional)
+            A function that returns the number of milliseconds left for the
+            analysis; None leaves the analysis unlimited in time
+
+        Returns
+        -------
+        list<AnalysisLine>
+            Up to `k` lines of the last completed iteration, best first;
+            empty if the active player has no moves or no iteration
+            completed
+        """
+        self._stop_pondering()
+        self.time_left = time_left if time_left is not None else lambda: math.inf
+        self._deadline = None
+        if self.engine is not None and not isinstance(game, self.engine):
+            game = self.engine.from_board(game)
+        tt = self.tt
+        if self.tt is None:
+            self.tt = TranspositionTable()
+        self.tt.new_search()
+        if self.move_orderer is not None:
+            self.move_orderer.new_search()
+
+        if depth is None and time_left is None:
+            depth = self.search_depth
+        moves = game.get_legal_moves()
+        maximizing_player = game.active_player == self
+        depths = range(1, (depth or len(game.get_blank_spaces())) + 1)
+        lines = []
+        try:
+            for current_depth in depths:
+                scores = []
+                for move in moves:
+                    scores.append((self._analyse_move(game, move, current_depth, scores, k,
+                                                      maximizing_player), move))
+                scores.sort(reverse=maximizing_player, key=lambda score_move: score_move[0])
+                moves = [move for _, move in scores]
+                lines = [AnalysisLine(move, score, self._principal_variation(game, move, current_depth),
+                                      current_depth)
+                         for score, move in scores[:k]]
+        except Timeout:
+            pass
+        finally:
+            self.tt = tt
+        return lines
+
+    def _analyse_move(self, game, move, depth, scores, k, maximizing_player):
+        """Search the root move `move` of `analyse()` to `depth`, bounded by
+        the k-th best of the `scores` of the moves searched before it.
+        """
+        successor = game.forecast_move(move)
+        if depth <= 1:
+            self._check_time()
+            return self.score(successor, self)
+        alpha, beta = float("-inf"), float("inf")
+        if len(scores) >= k:
+            bound = sorted((score for score, _ in scores), reverse=maximizing_player)[k - 1]
+            if maximizing_player:
+                alpha = bound
+            else:
+                beta = bound
+        score, _ = self._alphabeta(successor, depth - 1, alpha, beta, not maximizing_player,
+                                   self.method == 'pvs')
+        return score
+
+    def _principal_variation(self, game, move, depth):
+        """Return the moves expected to follow `move` in `game`, up to
+        `depth` moves, by following the best moves of the transposition
+        table.
+        """
+        pv = [move]
+        position = game.forecast_move(move)
+        while len(pv) < depth:
+            entry = self.tt.probe(self._position_key(position))
+            if entry is None or entry[MOVE] not in position.get_legal_moves():
+                break
+            pv.append(entry[MOVE])
+            position.apply_move(entry[MOVE])
+        return pv
+
+    def iter_search(self, game, time_left=None):
+        """Search the active player's best move in `game`, yielding the
+        result of every completed iteration of iterative deepening (or of
+        the single fixed-depth search).
+
+        The search runs between the results it yields, so the caller can
+        stop it at any time by not asking for the next result, and use the
+        last result received. Several searches can be interleaved by
+        advancing the generators of different agents in turn; an agent runs
+        one search at a time.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            The game state to search, with this agent as the active player
+
+        time_left : callable (optional)
+            A function that returns the number of milliseconds left in the
+            search; the search ends once fewer than `timeout` milliseconds
+            are left. None leaves the search unlimited in time, in which case
+            iterative deepening ends once the game tree is exhausted.
+
+        Yields
+        ------
+        SearchResult
+            The depth, score and best move of each completed iteration, and
+            the number of nodes searched so far
+        """
+        self._stop_pondering()
+        self.time_left = time_left if time_left is not None else lambda: math.inf
+        self._deadline = self.deadline
+        if self._deadline is not None:
+            self._deadline.reset(self.time_left, self.TIMER_THRESHOLD)
+        if not game.get_legal_moves():
+            return
+        if self.engine is not None and not isinstance(game, self.engine):
+            game = self.engine.from_board(game)
+        search_game = self._start_search(game)
+
+        if self.stats is not None:
+            search_start = time.perf_counter()
+            self.stats.start_search(game, game.get_legal_moves(), self.nodes_searched, self.cutoffs)
+        try:
+            yield from self._iterations(search_game)
+        except Timeout:
+            pass
+        finally:
+            if self.stats is not None:
+                self.stats.end_search(_millis_since(search_start), self.nodes_searched, self.cutoffs)
+
+    def _start_search(self, game):
+        """Prepare the search state for a new search of `game` and return
+        the board to search.
+        """
+        if self.tt is not None:
+            self.tt.new_search()
+        if self.move_orderer is not None:
+            self.move_orderer.new_search()
+        if self.time_manager is not None:
+            self.time_manager.new_search()
+        # an in-place search interrupted by a timeout leaves its board in an
+        # arbitrary state, so it runs on a private copy of the game
+        return game.copy() if self.inplace else game
+
+    def _iterations(self, game, first_depth=1, score=None):
+        """Run the iterations of the search of `game`, yielding a
+        `SearchResult` after each one; Timeout is raised when the time runs
+        out. Iterative deepening starts at `first_depth`, with `score` the
+        score of the previous iteration if known, and ends once the time
+        manager declines the next iteration or the depth exceeds the number
+        of blank cells, at which point the game tree is exhausted.
+        """
+        start_nodes = self.nodes_searched
+        if not self.iterative:
+            start = time.perf_counter()
+            score, move = self.search_method(game, self.search_depth)
+            self._iteration_completed(self.search_depth, _millis_since(start), score, move)
+            yield SearchResult(self.search_depth, score, move, self.nodes_searched - start_nodes)
+            return
+
+        max_depth = len(game.get_blank_spaces())
+        for depth in range(first_depth, max_depth + 1):
+            if self.time_manager is not None and \
+                    not self.time_manager.should_search(depth, self.time_left(), self.TIMER_THRESHOLD):
+                return
+            start = time.perf_counter()
+            try:
+                score, move = self._search_iteration(game, depth, score)
+            except Timeout:
+                if self.time_manager is not None:
+                    self.time_manager.record_timeout(depth, _millis_since(start))
+                raise
+            self._iteration_completed(depth, _millis_since(start), score, move)
+            yield SearchResult(depth, score, move, self.nodes_searched - start_nodes)
+
+    def _iteration_completed(self, depth, elapsed, score, move):
+        """Report an iteration that completed in `elapsed` milliseconds to
+        the time manager and statistics collector.
+        """
+        if self.time_manager is not None:
+            self.time_manager.record_iteration(depth, elapsed, score, move)
+        if self.stats is not None:
+            self.stats.record_iteration(depth, elapsed, self.nodes_searched)
+
+    def opponent_moved(self, move):
+        """Notification from `Board.play()` that the opponent has played
+        `move` and this agent is about to be asked for its next move. Stops
+        pondering so that the search does not compete with get_move().
+        """
+        self._stop_pondering()
+
+    def game_over(self, winner):
+        """Notification from `Board.play()` that the game has ended."""
+        self._stop_pondering()
+        self._ponder_result = None
+        if self.endgame is not None:
+            self.endgame.clear()
+
+    def _solve_endgame(self, game):
+        """Return the move starting the longest path of a partitioned
+        position, or None if the solver cannot finish in half of the time
+        left, or in half of the nodes left with a node budget.
+        """
+        if isinstance(self._deadline, NodeBudget):
+            # the solver's nodes count against the budget, whose time_left()
+            # is unlimited
+            budget = self._deadline
+            limit = budget.remaining() / 2
+
+            def check():
+                if budget.expired() or budget.remaining() < limit:
+                    raise Timeout()
+        else:
+            limit = (self.time_left() + self.TIMER_THRESHOLD) / 2
+
+            def check():
+                if self.time_left() < limit:
+                    raise Timeout()
+
+        try:
+            solution = self.endgame.solve(game, self, check)
+        except Timeout:
+            return None
+        if solution is None:
+            return None
+        self.endgame_solutions += 1
+        return solution[1]
+
+    def _start_pondering(self, game, move):
+        """Predict the opponent's reply to `move` and start searching the
+        resulting position in the pondering worker.
+        """
+        if self.pondering is None:
+            return
+        position = game.forecast_move(move)
+        replies = position.get_legal_moves()
+        if not replies:
+            return
+        entry = self.tt.probe(self._position_key(position))
+        reply = entry[MOVE] if entry is not None and entry[MOVE] in replies else replies[0]
+        position.apply_move(reply)
+        if not position.get_legal_moves():
+            return
+        self._ponder_key = self._position_key(position)
+        self.pondering.start(position, self)
+
+    def __getstate__(self):
+        """Return the state pickled when the agent is sent to another
+        process, e.g. by a parallel tournament. The clock of the last turn
+        and the worker processes cannot be pickled, so the copy neither
+        ponders nor searches in parallel.
+        """
+        state = dict(self.__dict__)
+        state["time_left"] = None
+        state["pondering"] = None
+        state["parallel"] = None
+        if self.stats is not None:
+            state["score"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if self.stats is not None:
+            self.score = self.stats.counting(self.score_fn)
+
+    def close(self):
+        """Stop the pondering and parallel search workers."""
+        self._stop_pondering()
+        if self.pondering is not None:
+            self.pondering.close()
+        if self.parallel is not None:
+            self.parallel.close()
+
+    def _stop_pondering(self):
+        """Stop the pondering search, if any, keep its deepest result and
+        load its transposition table entries.
+        """
+        if self.pondering is not None and self.pondering.running:
+            self._ponder_result, entries = self.pondering.stop()
+            self.tt.load(entries)
+
+    def _search_iteration(self, game, depth, last_score):
+        """Run one iteration of iterative deepening, using an aspiration
+        window centered on the score of the previous iteration when enabled.
+        """
+        if self.aspiration_window is None or self.method == 'minimax' or \
+                last_score is None or math.isinf(last_score):
+            return self.search_method(game, depth)
+
+        alpha = last_score - self.aspiration_window
+        beta = last_score + self.aspiration_window
+        score, move = self.search_method(game, depth, alpha, beta)
+        if score <= alpha or score >= beta:
+            score, move = self.search_method(game, depth)
+        return score, move
+
+    def _check_time(self):
+        """Count a search node and raise Timeout if the turn is over."""
+        self.nodes_searched += 1
+        if self._deadline is not None:
+            if self._deadline.expired():
+                raise Timeout()
+        elif self.time_left() < self.TIMER_THRESHOLD:
+            raise Timeout()
+
+    def _successor(self, game, move):
+        """Return the game state reached by applying `move` to `game`: the
+        board itself with the move applied when searching in place, or a
+        forecast copy of the board otherwise. Every call must be paired with
+        a call to `_retract()` once the successor has been searched.
+        """
+        if self.inplace:
+            game.apply_move(move)
+            return game
+        return game.forecast_move(move)
+
+    def _retract(self, game):
+        """Undo the move applied by `_successor()` when searching in place."""
+        if self.inplace:
+            game.undo_move()
+
+    def _score_leaves(self, game, moves):
+        """Return the scores of the children of `game` reached by `moves`,
+        evaluated together with the batch interface of the evaluation
+        function.
+        """
+        if self.stats is not None:
+            self.stats.leaf_evaluations += len(moves)
+        return self.score_many(game, moves, self)
+
+    def _position_key(self, game):
+        """Return the transposition table key for `game`. Scores are stored
+        from the point of view of this player, so the key also depends on the
+        player slot this player occupies.
+        """
+        if game.__player_1__ == self:
+            return game.hash_key
+        return game.hash_key ^ PERSPECTIVE_KEY
 
     def minimax(self, game, depth, maximizing_player=True):
         """Implement the minimax search algorithm as described in the lectures.
@@ -233,44 +794,28 @@ class CustomPlayer:
                 to pass the project unit tests; you cannot call any other
                 evaluation function directly.
         """
-        if self.time_left() < self.TIMER_THRESHOLD:
-            raise Timeout()
+        self._check_time()
 
         moves = game.get_legal_moves()
         if not moves:
             return game.utility(self), (-1, -1)
 
+        if depth <= 1 and self.score_many is not None:
+            scores = list(zip(self._score_leaves(game, moves), moves))
+        else:
+            scores = []
+            for move in moves:
+                successor = self._successor(game, move)
+                if depth <= 1:
+                    score = self.score(successor, self)
+                else:
+                    score, _ = self.minimax(successor, depth - 1, not maximizing_player)
+                self._retract(game)
+                scores.append((score, move))
+
         if maximizing_player:
-            if depth <= 1:
-                scores = [(self.score(game.forecast_move(move), self), move) for move in moves]
-                # print("{}Scoring move {}".format(self.indent, move))
-                # print(successor.to_string(indent=self.indent))
-            else:
-                # print("{}Evaluating move {}".format(self.indent, move))
-                # print(successor.to_string(indent=self.indent))
-                # self.indent += "__"
-                scores = [(self.minimax(game.forecast_move(move), depth - 1, not maximizing_player)[0], move)
-                          for move in moves]
-                # self.indent = self.indent[:-2]
-                # print("{}Score {}".format(self.indent, nv))
-            best_score = max(scores)
-        # print("{}Returning: score: {} move: {}".format(self.indent, v, smove))
-        if not maximizing_player:
-            if depth <= 1:
-                scores = [(self.score(game.forecast_move(move), self), move) for move in moves]
-                # print("{}Scoring move {}".format(self.indent, move))
-                # print(successor.to_string(indent=self.indent))
-            else:
-                # print("{}Evaluating move {}".format(self.indent, move))
-                # print(successor.to_string(indent=self.indent))
-                # self.indent += "__"
-                scores = [(self.minimax(game.forecast_move(move), depth - 1, not maximizing_player)[0], move)
-                          for move in moves]
-                # self.indent = self.indent[:-2]
-                # print("{}Score {}".format(self.indent, nv))
-            best_score = min(scores)
-        # print("{}Returning: score: {} move: {}".format(self.indent, v, smove))
-        return best_score
+            return max(scores)
+        return min(scores)
 
     def alphabeta(self, game, depth, alpha=float("-inf"), beta=float("inf"), maximizing_player=True):
 
@@ -312,61 +857,98 @@ class CustomPlayer:
                 evaluation function directly.
         """
 
-        if self.time_left() < self.TIMER_THRESHOLD:
-            raise Timeout()
+        return self._alphabeta(game, depth, alpha, beta, maximizing_player, False)
+
+    def pvs(self, game, depth, alpha=float("-inf"), beta=float("inf"), maximizing_player=True):
+        """Implement principal variation search (NegaScout): alpha-beta search
+        that searches the first move of every node with the full window and
+        the remaining moves with a null window, which only establishes whether
+        a move is better than the best one so far. Moves that turn out better
+        are searched again with the full window.
 
-        # print("{}Possible moves for input board is {}".format(self.indent, game.get_legal_moves()))
+        Parameters and return values are the same as for `alphabeta()`.
+        """
+        return self._alphabeta(game, depth, alpha, beta, maximizing_player, True)
+
+    def _alphabeta(self, game, depth, alpha, beta, maximizing_player, scout):
+        """Alpha-beta search shared by `alphabeta()` and `pvs()`; `scout`
+        selects null-window searches for all but the first move of a node.
+        """
+        self._check_time()
+
+        key = None
+        if self.tt is not None or self.move_orderer is not None:
+            key = self._position_key(game)
+
+        hash_move = None
+        if self.tt is not None:
+            entry = self.tt.probe(key)
+            if entry is not None:
+                _, entry_depth, entry_value, entry_flag, hash_move, _ = entry
+                if entry_depth >= depth and \
+                        (entry_flag == EXACT or
+                         (entry_flag == LOWER and entry_value >= beta) or
+                         (entry_flag == UPPER and entry_value <= alpha)):
+                    return entry_value, hash_move
+            alpha_orig, beta_orig = alpha, beta
 
         moves = game.get_legal_moves()
 
         if not moves:
             return game.utility(self), (-1, -1)
 
-        if maximizing_player:
-            scores = []
-            for move in moves:
-                successor = game.forecast_move(move)
+        if self.move_orderer is not None:
+            moves = self.move_orderer.order(moves, game.move_count, key, hash_move)
 
+        leaf_scores = None
+        if depth <= 1 and self.score_many is not None:
+            leaf_scores = self._score_leaves(game, moves)
+
+        scores = []
+        best = None
+        for index, move in enumerate(moves):
+            if leaf_scores is not None:
+                score = leaf_scores[index]
+            else:
+                successor = self._successor(game, move)
                 if depth <= 1:
                     score = self.score(successor, self)
-                    # print("{}Scoring move {}".format(self.indent, move))
-                    # print(successor.to_string(indent=self.indent))
+                elif not scout or not scores:
+                    score, _ = self._alphabeta(successor, depth - 1, alpha, beta, not maximizing_player, scout)
                 else:
-                    # print("{}Evaluating move {}".format(self.indent, move))
-                    # print(successor.to_string(indent=self.indent))
-                    # self.indent += "__"
-                    (score, _) = self.alphabeta(successor, depth - 1, alpha, beta, not maximizing_player)
-                    # self.indent = self.indent[:-2]
-                scores.append((score, move))
-                # print("{}Score {}".format(self.indent, score))
+                    if maximizing_player:
+                        null_alpha, null_beta = alpha, math.nextafter(alpha, math.inf)
+                    else:
+                        null_alpha, null_beta = math.nextafter(beta, -math.inf), beta
+                    score, _ = self._alphabeta(successor, depth - 1, null_alpha, null_beta, not maximizing_player, scout)
+                    if alpha < score < beta:
+                        score, _ = self._alphabeta(successor, depth - 1, alpha, beta, not maximizing_player, scout)
+                self._retract(game)
+            scores.append((score, move))
+
+            if maximizing_player:
                 if score >= beta:
-                    return score, move
+                    best = score, move
+                    break
                 if score > alpha:
                     alpha = score
-            # print("{}Returning: score: {} move: {}".format(self.indent, max(scores)[0], max(scores)[1]))
-            best_move = max(scores)
-
-        if not maximizing_player:
-            scores = []
-            for move in moves:
-                successor = game.forecast_move(move)
-                if depth <= 1:
-                    score = self.score(successor, self)
-                    # print("{}Scoring move {}".format(self.indent, move))
-                    # print(successor.to_string(indent=self.indent))
-                else:
-                    # print("{}Evaluating move {}".format(self.indent, move))
-                    # print(successor.to_string(indent=self.indent))
-                    # self.indent += "__"
-                    (score, _) = self.alphabeta(successor, depth - 1, alpha, beta, not maximizing_player)
-                    # self.indent = self.indent[:-2]
-                scores.append((score, move))
-                # print("{}Score {}".format(self.indent, score))
+            else:
                 if score <= alpha:
-                    return score, move
+                    best = score, move
+                    break
                 if score < beta:
                     beta = score
-            best_move = min(scores)
-            # print("{}Returning: Score: {} move: {}".format(self.indent, v, smove))
 
-        return best_move
+        if best is not None:
+            self.cutoffs += 1
+            if self.move_orderer is not None:
+                self.move_orderer.record_cutoff(best[1], game.move_count, depth, len(scores) - 1)
+        if best is None:
+            best = max(scores) if maximizing_player else min(scores)
+
+        if self.move_orderer is not None:
+            self.move_orderer.record_best(key, best[1])
+        if self.tt is not None:
+            flag = bound_type(best[0], alpha_orig, beta_orig, maximizing_player)
+            self.tt.store(key, depth, best[0], flag, best[1])
+        return best
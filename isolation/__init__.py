@@ -9,8 +9,9 @@ legal moves loses, and the opponent is declared the winner.
 
 import io
 
-# Make the Board class available at the root of the module for imports
+# Make the Board classes available at the root of the module for imports
 from .isolation import Board
+from .bitboard import BitBoard
 
 
 def game_as_text(winner, move_history, termination="", board=Board(1, 2)):
@@ -0,0 +1,285 @@
+"""
+This file contains the `BitBoard` class, an alternative engine for the game
+Isolation that is drop-in compatible with `isolation.Board`.
+
+Instead of a list of lists, the blocked cells are packed into a single Python
+int with one bit per cell, and the knight moves available from every cell are
+precomputed once per board size. Move generation, legality tests and the
+utility function then reduce to a handful of bitwise operations.
+"""
+
+from copy import copy
+
+from .isolation import Board
+from .isolation import window_mask
+from .isolation import zobrist_tables
+
+
+KNIGHT_DIRECTIONS = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
+                     (1, -2),  (1, 2), (2, -1),  (2, 1)]
+
+# Precomputed lookup tables shared by all boards of the same size
+_TABLES = {}
+
+
+def knight_tables(width, height):
+    """
+    Return the precomputed lookup tables for a board of the given size.
+
+    Cells are numbered column by column (bit `col * height + row`), which
+    makes the order of the set bits match the order of
+    `Board.get_blank_spaces()`.
+
+    Returns
+    ----------
+    (list<(int, int)>, dict, dict)
+        The cell coordinates indexed by bit number, a dict mapping each cell
+        to a tuple of (bit, move) pairs for its knight moves (in the same
+        order as `Board.__get_moves__`), and a dict mapping each cell to the
+        mask of all its knight moves.
+    """
+    key = (width, height)
+    if key not in _TABLES:
+        cells = [(row, col) for col in range(width) for row in range(height)]
+        bits = {cell: 1 << idx for idx, cell in enumerate(cells)}
+        moves = {}
+        masks = {}
+        for (r, c) in cells:
+            targets = [(r + dr, c + dc) for dr, dc in KNIGHT_DIRECTIONS if (r + dr, c + dc) in bits]
+            moves[(r, c)] = tuple((bits[t], t) for t in targets)
+            masks[(r, c)] = sum(bits[t] for t in targets)
+        _TABLES[key] = (cells, moves, masks)
+    return _TABLES[key]
+
+
+class BitBoard(Board):
+    """
+    Implement the `isolation.Board` model for Isolation with the board state
+    stored as a bitboard.
+
+    Parameters
+    ----------
+    player_1 : object
+        An object with a get_move() function. This is the only function
+        directly called by the Board class for each player.
+
+    player_2 : object
+        An object with a get_move() function. This is the only function
+        directly called by the Board class for each player.
+
+    width : int (optional)
+        The number of columns that the board should have.
+
+    height : int (optional)
+        The number of rows that the board should have.
+    """
+
+    def __init__(self, player_1, player_2, width=7, height=7):
+        self.width = width
+        self.height = height
+        self.move_count = 0
+        self.__player_1__ = player_1
+        self.__player_2__ = player_2
+        self.__active_player__ = player_1
+        self.__inactive_player__ = player_2
+        self.__last_player_move__ = {player_1: Board.NOT_MOVED, player_2: Board.NOT_MOVED}
+        self.__player_symbols__ = {Board.BLANK: Board.BLANK, player_1: 1, player_2: 2}
+        self._cells, self._moves, self._masks = knight_tables(width, height)
+        self._full = (1 << (width * height)) - 1
+        self._occupied = 0
+        self._visited = {1: 0, 2: 0}
+        self.__undo_stack__ = []
+        self.__zobrist__ = zobrist_tables(width, height)
+        self.__hash_key__ = 0
+
+    @property
+    def __board_state__(self):
+        """
+        A list of lists view of the board state, compatible with
+        `Board.__board_state__`. The view is rebuilt on every access, so
+        changes made to it are not reflected on the board.
+        """
+        state = [[Board.BLANK for i in range(self.width)] for j in range(self.height)]
+        for symbol, visited in self._visited.items():
+            for row, col in self._cells_in(visited):
+                state[row][col] = symbol
+        return state
+
+    @__board_state__.setter
+    def __board_state__(self, state):
+        self._occupied = 0
+        self._visited = {1: 0, 2: 0}
+        for row in range(self.height):
+            for col in range(self.width):
+                symbol = state[row][col]
+                if symbol != Board.BLANK:
+                    bit = 1 << (col * self.height + row)
+                    self._occupied |= bit
+                    self._visited[symbol] |= bit
+
+    def _cells_in(self, mask):
+        """ Return the list of cells whose bits are set in `mask`. """
+        cells = []
+        while mask:
+            low = mask & -mask
+            cells.append(self._cells[low.bit_length() - 1])
+            mask ^= low
+        return cells
+
+    def _has_moves(self, player):
+        """ Test whether the specified player has any legal move. """
+        loc = self.__last_player_move__[player]
+        if loc == Board.NOT_MOVED:
+            return self._occupied != self._full
+        return bool(self._masks[loc] & ~self._occupied)
+
+    def copy(self):
+        """
+        Return a deep copy of the current board. The copy starts with an
+        empty undo history.
+        """
+        new_board = self.__class__(self.__player_1__, self.__player_2__, width=self.width, height=self.height)
+        new_board.move_count = self.move_count
+        new_board.__active_player__ = self.__active_player__
+        new_board.__inactive_player__ = self.__inactive_player__
+        new_board.__last_player_move__ = copy(self.__last_player_move__)
+        new_board.__player_symbols__ = copy(self.__player_symbols__)
+        new_board._occupied = self._occupied
+        new_board._visited = copy(self._visited)
+        new_board.__hash_key__ = self.__hash_key__
+        return new_board
+
+    def move_is_legal(self, move):
+        """
+        Test whether a move is legal in the current game state.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+
+        Returns
+        ----------
+        bool
+            Returns True if the move is legal, False otherwise
+        """
+        row, col = move
+        return 0 <= row < self.height and \
+               0 <= col < self.width and \
+               not self._occupied & (1 << (col * self.height + row))
+
+    def count_blank_cells(self, top, left, bottom, right):
+        """
+        Return the number of blank cells in a rectangle of the board.
+
+        See `Board.count_blank_cells()`.
+        """
+        mask = window_mask(self.width, self.height, top, left, bottom, right)
+        return bin(mask & ~self._occupied).count("1")
+
+    def get_blank_spaces(self):
+        """
+        Return a list of the locations that are still available on the board.
+        """
+        return self._cells_in(self._full & ~self._occupied)
+
+    def get_legal_moves(self, player=None):
+        """
+        Return the list of all legal moves for the specified player.
+
+        Parameters
+        ----------
+        player : object (optional)
+            An object registered as a player in the current game. If None,
+            return the legal moves for the active player on the board.
+
+        Returns
+        ----------
+        list<(int, int)>
+            The list of coordinate pairs (row, column) of all legal moves
+            for the player constrained by the current game state.
+        """
+        if player is None:
+            player = self.__active_player__
+        return self.__get_moves__(self.__last_player_move__[player])
+
+    def apply_move(self, move):
+        """
+        Move the active player to a specified location.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+
+        Returns
+        ----------
+        None
+        """
+        row, col = move
+        bit = 1 << (col * self.height + row)
+        player = self.__active_player__
+        symbol = self.__player_symbols__[player]
+        last_move = self.__last_player_move__[player]
+        self.__undo_stack__.append((bit, symbol, last_move, self.__hash_key__))
+        self.__hash_key__ = self._hash_key_after(symbol, move, last_move)
+        self.__last_player_move__[player] = move
+        self._occupied |= bit
+        self._visited[symbol] |= bit
+        self.__active_player__, self.__inactive_player__ = self.__inactive_player__, player
+        self.move_count += 1
+
+    def undo_move(self):
+        """
+        Revert the last move applied to this board with apply_move().
+
+        See `Board.undo_move()`.
+        """
+        if not self.__undo_stack__:
+            raise RuntimeError("There is no move to undo on this board.")
+        bit, symbol, last_move, self.__hash_key__ = self.__undo_stack__.pop()
+        player = self.__inactive_player__
+        self.__active_player__, self.__inactive_player__ = player, self.__active_player__
+        self.__last_player_move__[player] = last_move
+        self._occupied ^= bit
+        self._visited[symbol] ^= bit
+        self.move_count -= 1
+
+    def is_winner(self, player):
+        """ Test whether the specified player has won the game. """
+        return player == self.__inactive_player__ and not self._has_moves(self.__active_player__)
+
+    def is_loser(self, player):
+        """ Test whether the specified player has lost the game. """
+        return player == self.__active_player__ and not self._has_moves(self.__active_player__)
+
+    def utility(self, player):
+        """
+        Returns the utility of the current game state from the perspective
+        of the specified player.
+
+        See `Board.utility()`.
+        """
+        if not self._has_moves(self.__active_player__):
+
+            if player == self.__inactive_player__:
+                return float("inf")
+
+            if player == self.__active_player__:
+                return float("-inf")
+
+        return 0.
+
+    def __get_moves__(self, move):
+        """
+        Generate the list of possible moves for an L-shaped motion (like a
+        knight in chess) from the precomputed move table.
+        """
+
+        if move == Board.NOT_MOVED:
+            return self.get_blank_spaces()
+
+        occupied = self._occupied
+        return [target for bit, target in self._moves[move] if not occupied & bit]
@@ -8,6 +8,7 @@ remain compatible with the defaults provided, and none of your changes will
 be available to project reviewers.
 """
 
+import random
 import timeit
 
 from copy import deepcopy
@@ -16,6 +17,54 @@ from copy import copy
 
 TIME_LIMIT_MILLIS = 200
 
+# Zobrist key tables shared by all boards of the same size
+_ZOBRIST_TABLES = {}
+
+
+def zobrist_tables(width, height):
+    """
+    Return the Zobrist key tables for a board of the given size.
+
+    The tables are generated from a fixed seed, so the position keys are
+    stable across runs and processes. Cells are indexed column by column
+    (`col * height + row`) like the bits of `isolation.BitBoard`.
+
+    Returns
+    ----------
+    (list<int>, dict, int)
+        The 64-bit keys for a blocked cell indexed by cell, a dict mapping
+        each player symbol (1 or 2) to the keys for that player standing on
+        each cell, and the key toggled when player 2 holds the initiative.
+    """
+    key = (width, height)
+    if key not in _ZOBRIST_TABLES:
+        rng = random.Random("isolation-zobrist-{}x{}".format(width, height))
+        num_cells = width * height
+        blocked = [rng.getrandbits(64) for _ in range(num_cells)]
+        locations = {symbol: [rng.getrandbits(64) for _ in range(num_cells)] for symbol in (1, 2)}
+        _ZOBRIST_TABLES[key] = (blocked, locations, rng.getrandbits(64))
+    return _ZOBRIST_TABLES[key]
+
+
+# Masks of the rectangles counted by count_blank_cells(), by board size and
+# corners
+_WINDOWS = {}
+
+
+def window_mask(width, height, top, left, bottom, right):
+    """
+    Return the mask of the cells of a rectangle of a board of the given
+    size, with cells numbered column by column (bit `col * height + row`)
+    like the bits of `isolation.BitBoard`. Masks are built once and cached.
+    """
+    key = (width, height, top, left, bottom, right)
+    mask = _WINDOWS.get(key)
+    if mask is None:
+        mask = _WINDOWS[key] = sum(1 << (col * height + row)
+                                   for col in range(left, right + 1)
+                                   for row in range(top, bottom + 1))
+    return mask
+
 
 class Board(object):
     """
@@ -52,6 +101,69 @@ class Board(object):
         self.__board_state__ = [[Board.BLANK for i in range(width)] for j in range(height)]
         self.__last_player_move__ = {player_1: Board.NOT_MOVED, player_2: Board.NOT_MOVED}
         self.__player_symbols__ = {Board.BLANK: Board.BLANK, player_1: 1, player_2: 2}
+        self.__undo_stack__ = []
+        self.__zobrist__ = zobrist_tables(width, height)
+        self.__hash_key__ = 0
+        self.__blank_mask__ = None
+
+    def __hash__(self):
+        return self.__hash_key__
+
+    def __eq__(self, other):
+        """
+        Boards are equal when they encode the same position: the same blocked
+        cells, the same location for each player slot and the same player
+        slot holding the initiative, regardless of the board engine or of the
+        objects registered as players.
+        """
+        if not isinstance(other, Board):
+            return NotImplemented
+        return self.__hash_key__ == other.__hash_key__ and \
+            self.width == other.width and self.height == other.height and \
+            self.move_count == other.move_count and \
+            (self.__active_player__ == self.__player_1__) == (other.__active_player__ == other.__player_1__) and \
+            self.__last_player_move__[self.__player_1__] == other.__last_player_move__[other.__player_1__] and \
+            self.__last_player_move__[self.__player_2__] == other.__last_player_move__[other.__player_2__] and \
+            self.get_blank_spaces() == other.get_blank_spaces()
+
+    @property
+    def hash_key(self):
+        """
+        A 64-bit Zobrist key for the current position, updated incrementally
+        by apply_move() and undo_move(). The key covers the blocked cells, the
+        location of each player slot and the player slot to move.
+        """
+        return self.__hash_key__
+
+    def _compute_hash_key(self):
+        """ Compute the Zobrist key of the current position from scratch. """
+        blocked, locations, side = self.__zobrist__
+        blank_spaces = set(self.get_blank_spaces())
+        key = 0
+        for col in range(self.width):
+            for row in range(self.height):
+                if (row, col) not in blank_spaces:
+                    key ^= blocked[col * self.height + row]
+        for player in (self.__player_1__, self.__player_2__):
+            location = self.__last_player_move__[player]
+            if location != Board.NOT_MOVED:
+                key ^= locations[self.__player_symbols__[player]][location[1] * self.height + location[0]]
+        if self.__active_player__ == self.__player_2__:
+            key ^= side
+        return key
+
+    def _hash_key_after(self, symbol, move, last_move):
+        """
+        Return the Zobrist key of the position reached when the player with
+        the given symbol moves from `last_move` to `move`.
+        """
+        blocked, locations, side = self.__zobrist__
+        player_keys = locations[symbol]
+        index = move[1] * self.height + move[0]
+        key = self.__hash_key__ ^ blocked[index] ^ player_keys[index] ^ side
+        if last_move != Board.NOT_MOVED:
+            key ^= player_keys[last_move[1] * self.height + last_move[0]]
+        return key
 
     @property
     def active_player(self):
@@ -92,7 +204,11 @@ class Board(object):
         raise RuntimeError("`player` must be an object registered as a player in the current game.")
 
     def copy(self):
-        """ Return a deep copy of the current board. """
+        """
+        Return a deep copy of the current board. The copy starts with an
+        empty undo history, so moves applied before the copy was made cannot
+        be undone on it.
+        """
         new_board = Board(self.__player_1__, self.__player_2__, width=self.width, height=self.height)
         new_board.move_count = self.move_count
         new_board.__active_player__ = self.__active_player__
@@ -100,6 +216,34 @@ class Board(object):
         new_board.__last_player_move__ = copy(self.__last_player_move__)
         new_board.__player_symbols__ = copy(self.__player_symbols__)
         new_board.__board_state__ = deepcopy(self.__board_state__)
+        new_board.__hash_key__ = self.__hash_key__
+        new_board.__blank_mask__ = self.__blank_mask__
+        return new_board
+
+    @classmethod
+    def from_board(cls, board):
+        """
+        Return a new board of this class holding the same game state as the
+        supplied board, which may use a different board engine.
+
+        Parameters
+        ----------
+        board : `isolation.Board`
+            The game state to convert.
+
+        Returns
+        ----------
+        `isolation.Board`
+            An instance of `cls` encoding the same game state as `board`.
+        """
+        new_board = cls(board.__player_1__, board.__player_2__, width=board.width, height=board.height)
+        new_board.move_count = board.move_count
+        new_board.__active_player__ = board.__active_player__
+        new_board.__inactive_player__ = board.__inactive_player__
+        new_board.__last_player_move__ = copy(board.__last_player_move__)
+        new_board.__player_symbols__ = copy(board.__player_symbols__)
+        new_board.__board_state__ = deepcopy(board.__board_state__)
+        new_board.__hash_key__ = new_board._compute_hash_key()
         return new_board
 
     def forecast_move(self, move):
@@ -149,6 +293,42 @@ class Board(object):
         return [(i, j) for j in range(self.width) for i in range(self.height)
             if self.__board_state__[i][j] == Board.BLANK]
 
+    def count_blank_cells(self, top, left, bottom, right):
+        """
+        Return the number of blank cells in a rectangle of the board.
+
+        The blank cells are kept in a bitmask, built on the first call and
+        then updated by apply_move() and undo_move(), so a count is one AND
+        with the cached mask of the rectangle plus a popcount. Changes made
+        to `__board_state__` other than through apply_move() and undo_move()
+        must be made before the first call.
+
+        Parameters
+        ----------
+        top, left : int
+            The row and column of the top left cell of the rectangle
+
+        bottom, right : int
+            The row and column of the bottom right cell of the rectangle
+            (inclusive)
+
+        Returns
+        ----------
+        int
+            The number of blank cells in the rectangle
+        """
+        blanks = self.__blank_mask__
+        if blanks is None:
+            blanks = self.__blank_mask__ = self.__compute_blank_mask__()
+        return bin(blanks & window_mask(self.width, self.height, top, left, bottom, right)).count("1")
+
+    def __compute_blank_mask__(self):
+        """
+        Return the mask of the blank cells, numbered like the cells of
+        window_mask().
+        """
+        return sum(1 << (col * self.height + row) for row, col in self.get_blank_spaces())
+
     def get_player_location(self, player):
         """
         Find the current location of the specified player on the board.
@@ -200,11 +380,40 @@ class Board(object):
         None
         """
         row, col = move
+        symbol = self.__player_symbols__[self.active_player]
+        last_move = self.__last_player_move__[self.active_player]
+        self.__undo_stack__.append((move, last_move, self.__hash_key__))
+        self.__hash_key__ = self._hash_key_after(symbol, move, last_move)
         self.__last_player_move__[self.active_player] = move
-        self.__board_state__[row][col] = self.__player_symbols__[self.active_player]
+        self.__board_state__[row][col] = symbol
+        if self.__blank_mask__ is not None:
+            self.__blank_mask__ ^= 1 << (col * self.height + row)
         self.__active_player__, self.__inactive_player__ = self.__inactive_player__, self.__active_player__
         self.move_count += 1
 
+    def undo_move(self):
+        """
+        Revert the last move applied to this board with apply_move(),
+        restoring the previous location of the player that moved, the blocked
+        cell, the active player, the move count and the position key.
+        Together with apply_move() this allows a search to walk the game tree
+        in place instead of creating a copy of the board for every node with
+        forecast_move().
+
+        Returns
+        ----------
+        None
+        """
+        if not self.__undo_stack__:
+            raise RuntimeError("There is no move to undo on this board.")
+        (row, col), last_move, self.__hash_key__ = self.__undo_stack__.pop()
+        self.__active_player__, self.__inactive_player__ = self.__inactive_player__, self.__active_player__
+        self.__last_player_move__[self.__active_player__] = last_move
+        self.__board_state__[row][col] = Board.BLANK
+        if self.__blank_mask__ is not None:
+            self.__blank_mask__ ^= 1 << (col * self.height + row)
+        self.move_count -= 1
+
     def is_winner(self, player):
         """ Test whether the specified player has won the game. """
         return player == self.inactive_player and not self.get_legal_moves(self.active_player)
@@ -277,6 +486,7 @@ class Board(object):
 
         p1_loc = self.__last_player_move__[self.__player_1__]
         p2_loc = self.__last_player_move__[self.__player_2__]
+        board_state = self.__board_state__
 
         out = "{}   |".format(indent)
 
@@ -289,7 +499,7 @@ class Board(object):
 
             for j in range(self.width):
 
-                if not self.__board_state__[i][j]:
+                if not board_state[i][j]:
                     out += ' '
                 elif p1_loc and i == p1_loc[0] and j == p1_loc[1]:
                     out += '1'
@@ -308,6 +518,12 @@ class Board(object):
         Execute a match between the players by alternately soliciting them
         to select a move and applying it in the game.
 
+        Players may optionally implement two notification methods: after a
+        move has been applied, `opponent_moved(move)` is called on the player
+        about to move before its clock starts, and when the game ends
+        `game_over(winner)` is called on both players. Notifications must
+        return promptly (e.g., by stopping any background search).
+
         Parameters
         ----------
         time_limit : numeric (optional)
@@ -347,9 +563,26 @@ class Board(object):
                 move_history[-1].append(curr_move)
 
             if move_end < 0:
-                return self.__inactive_player__, move_history, "timeout"
+                return self.__game_over__(move_history, "timeout")
 
             if curr_move not in legal_player_moves:
-                return self.__inactive_player__, move_history, "illegal move"
+                return self.__game_over__(move_history, "illegal move")
 
             self.apply_move(curr_move)
+            self.__notify__(self.active_player, "opponent_moved", curr_move)
+
+    def __notify__(self, player, notification, *args):
+        """ Call an optional notification method on a player, if defined. """
+        callback = getattr(player, notification, None)
+        if callback is not None:
+            callback(*args)
+
+    def __game_over__(self, move_history, termination):
+        """
+        End a game lost by the active player, notifying both players, and
+        return the result tuple of play().
+        """
+        winner = self.__inactive_player__
+        self.__notify__(self.__player_1__, "game_over", winner)
+        self.__notify__(self.__player_2__, "game_over", winner)
+        return winner, move_history, termination
@@ -0,0 +1,198 @@
+"""This file contains `MCTSPlayer`, an agent for Isolation that chooses its
+moves by Monte Carlo tree search with UCT selection.
+
+Every iteration walks down the search tree choosing the child with the best
+upper confidence bound, adds one new node, plays the game out to the end and
+propagates the result back to the root. Moves are applied and undone in place
+on a single `isolation.BitBoard`, so a rollout costs no board copies.
+
+The tree is kept between turns: after choosing a move the agent keeps the
+subtree below it, and on its next turn it continues from the node matching
+the opponent's reply when that reply was explored.
+"""
+
+import math
+import random
+
+from game_agent import Timeout
+from isolation import BitBoard
+
+
+class _Node:
+    """A node of the search tree: the position reached by `move`."""
+
+    # nodes hold no reference to their parent: without reference cycles a
+    # discarded tree is freed at once rather than by the garbage collector
+    __slots__ = ("move", "key", "children", "untried", "visits", "wins")
+
+    def __init__(self, move, key, untried):
+        self.move = move
+        self.key = key
+        self.children = []
+        self.untried = untried
+        self.visits = 0
+        # wins of the player who made `move`
+        self.wins = 0.
+
+
+class MCTSPlayer:
+    """Game-playing agent that chooses a move using Monte Carlo tree search.
+
+    Parameters
+    ----------
+    exploration : float (optional)
+        The exploration constant of the UCT formula; larger values spread the
+        iterations more evenly between moves.
+
+    guided : boolean (optional)
+        Flag indicating whether rollouts prefer moves that keep the most
+        moves available for the next turn instead of playing uniformly at
+        random. Guided rollouts are more accurate but slower.
+
+    timeout : float (optional)
+        Time remaining (in milliseconds) when search is aborted. Should be a
+        positive value large enough to allow the function to return before the
+        timer expires.
+
+    engine : class (optional)
+        The board class the search runs on; games supplied with a different
+        board class are converted before searching.
+
+    reuse_tree : boolean (optional)
+        Flag indicating whether to keep the subtree of the chosen move for the
+        next turn.
+
+    iteration_budget : int (optional)
+        The number of iterations run per call to get_move(). When set, the
+        search stops after that many iterations instead of when the time
+        runs out, so that its result does not depend on the speed of the
+        machine.
+    """
+
+    def __init__(self, exploration=math.sqrt(2), guided=False, timeout=10.,
+                 engine=BitBoard, reuse_tree=True, iteration_budget=None):
+        self.exploration = exploration
+        self.guided = guided
+        self.TIMER_THRESHOLD = timeout
+        self.engine = engine
+        self.reuse_tree = reuse_tree
+        self.iteration_budget = iteration_budget
+        self.time_left = None
+        self.iterations = 0
+        self.reused_visits = 0
+        self._root = None
+
+    def get_move(self, game, legal_moves, time_left):
+        """Search for the best move from the available legal moves and return a
+        result before the time limit expires.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            An instance of `isolation.Board` encoding the current state of the
+            game (e.g., player locations and blocked cells).
+
+        legal_moves : list<(int, int)>
+            A list containing legal moves. Moves are encoded as tuples of pairs
+            of ints defining the next (row, col) for the agent to occupy.
+
+        time_left : callable
+            A function that returns the number of milliseconds left in the
+            current turn. Returning with any less than 0 ms remaining forfeits
+            the game.
+
+        Returns
+        -------
+        (int, int)
+            The most visited move at the root; may return (-1, -1) if there
+            are no available legal moves.
+        """
+        self.time_left = time_left
+        if not legal_moves:
+            return -1, -1
+
+        game = self.engine.from_board(game) if not isinstance(game, self.engine) else game.copy()
+        root = self._find_root(game)
+        self.reused_visits += root.visits
+
+        iterations = 0
+        try:
+            while self.iteration_budget is None or iterations < self.iteration_budget:
+                if self.iteration_budget is None and self.time_left() < self.TIMER_THRESHOLD:
+                    raise Timeout()
+                self._iterate(game, root)
+                iterations += 1
+        except Timeout:
+            pass
+        self.iterations += iterations
+
+        if not root.children:
+            return legal_moves[0]
+        best = max(root.children, key=lambda child: child.visits)
+        if self.reuse_tree:
+            self._root = best
+        return best.move
+
+    def game_over(self, winner):
+        """Discard the search tree at the end of a game."""
+        self._root = None
+
+    def _find_root(self, game):
+        """Return the node of the stored tree matching the game, or a new
+        root node.
+        """
+        key = game.hash_key
+        if self._root is not None:
+            for child in self._root.children:
+                if child.key == key:
+                    return child
+        self._root = None
+        return _Node(None, key, game.get_legal_moves())
+
+    def _iterate(self, game, root):
+        """Run one iteration of selection, expansion, rollout and
+        backpropagation from the root, leaving the game unchanged.
+        """
+        player, opponent = game.active_player, game.inactive_player
+        node = root
+        path = [root]
+
+        # selection
+        while not node.untried and node.children:
+            log_visits = math.log(node.visits)
+            node = max(node.children, key=lambda child: child.wins / child.visits +
+                       self.exploration * math.sqrt(log_visits / child.visits))
+            game.apply_move(node.move)
+            path.append(node)
+
+        # expansion
+        if node.untried:
+            move = node.untried.pop(random.randrange(len(node.untried)))
+            game.apply_move(move)
+            node = _Node(move, game.hash_key, game.get_legal_moves())
+            path[-1].children.append(node)
+            path.append(node)
+
+        # rollout: the player left without moves loses
+        depth = len(path) - 1
+        moves = game.get_legal_moves()
+        while moves:
+            game.apply_move(self._rollout_move(game, moves))
+            depth += 1
+            moves = game.get_legal_moves()
+        loser = game.active_player
+        for _ in range(depth):
+            game.undo_move()
+
+        # backpropagation: the wins of a node count for the player who moved
+        # into it, which is the player to move at the root for odd depths
+        for tree_depth, node in enumerate(path):
+            node.visits += 1
+            if (player if tree_depth % 2 else opponent) != loser:
+                node.wins += 1
+
+    def _rollout_move(self, game, moves):
+        """Choose the next move of a rollout."""
+        if not self.guided or len(moves) == 1:
+            return random.choice(moves)
+        return max(moves, key=lambda move: (len(game.__get_moves__(move)), random.random()))
@@ -0,0 +1,134 @@
+"""This file contains the move ordering used by `CustomPlayer.alphabeta()` to
+search the moves most likely to cause a cutoff first.
+
+Moves are ordered by three signals, strongest first:
+
+- the hash move: the best move found for the position by an earlier search
+  (the previous iteration of iterative deepening or the transposition table)
+- killer moves: moves that recently caused a cutoff at the same ply
+- the history heuristic: a score per destination cell that grows every time
+  a move to that cell causes a cutoff, weighted by the remaining depth
+
+Any object providing the `order()`, `record_cutoff()`, `record_best()` and
+`new_search()` methods can be passed to `CustomPlayer` instead.
+"""
+
+HASH_MOVE_BONUS = 1 << 40
+KILLER_BONUS = 1 << 30
+
+
+class MoveOrderer:
+    """Order moves with the hash move, killer moves and history heuristic.
+
+    Parameters
+    ----------
+    use_hash_move : bool (optional)
+        Flag indicating whether to search the hash move first
+
+    num_killers : int (optional)
+        The number of killer moves kept per ply; 0 disables killer moves
+
+    use_history : bool (optional)
+        Flag indicating whether to order the remaining moves by their
+        history score
+    """
+
+    def __init__(self, use_hash_move=True, num_killers=2, use_history=True):
+        self.use_hash_move = use_hash_move
+        self.num_killers = num_killers
+        self.use_history = use_history
+        self.killers = {}
+        self.history = {}
+        self.best_moves = {}
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    def new_search(self):
+        """Prepare for a new call to get_move(): forget the best moves of the
+        previous move's search and age the history scores.
+        """
+        self.best_moves = {}
+        self.history = {move: value // 2 for move, value in self.history.items() if value > 1}
+
+    def order(self, moves, ply, key, hash_move=None):
+        """Return the moves sorted from most to least promising.
+
+        Parameters
+        ----------
+        moves : list<(int, int)>
+            The legal moves in the position
+
+        ply : int
+            The number of moves played in the game so far (i.e.,
+            `game.move_count`), used to index the killer moves
+
+        key : int
+            The position key, used to look up the best move recorded by a
+            previous iteration
+
+        hash_move : tuple(int, int) (optional)
+            The best move stored for the position in a transposition table;
+            takes precedence over the recorded best move
+
+        Returns
+        -------
+        list<(int, int)>
+            The moves in search order
+        """
+        if hash_move is None and self.use_hash_move:
+            hash_move = self.best_moves.get(key)
+        killers = self.killers.get(ply, ())
+        history = self.history
+
+        def priority(move):
+            value = history.get(move, 0) if self.use_history else 0
+            if move in killers:
+                value += KILLER_BONUS
+            if move == hash_move and self.use_hash_move:
+                value += HASH_MOVE_BONUS
+            return value
+
+        return sorted(moves, key=priority, reverse=True)
+
+    def record_cutoff(self, move, ply, depth, index):
+        """Update the killer moves and history after `move` caused a cutoff.
+
+        Parameters
+        ----------
+        move : tuple(int, int)
+            The move that caused the cutoff
+
+        ply : int
+            The number of moves played in the game so far
+
+        depth : int
+            The remaining search depth at the node
+
+        index : int
+            The position of the move in the search order of the node
+        """
+        self.cutoffs += 1
+        if index == 0:
+            self.first_move_cutoffs += 1
+        if self.num_killers:
+            killers = self.killers.setdefault(ply, [])
+            if move not in killers:
+                killers.insert(0, move)
+                del killers[self.num_killers:]
+        if self.use_history:
+            self.history[move] = self.history.get(move, 0) + depth * depth
+
+    def record_best(self, key, move):
+        """Remember the best move found for a position."""
+        self.best_moves[key] = move
+
+    @property
+    def first_move_cutoff_rate(self):
+        """The fraction of cutoffs caused by the first move searched."""
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.
+
+    def stats(self):
+        """Return the ordering counters as a dict."""
+        return {"cutoffs": self.cutoffs,
+                "first_move_cutoffs": self.first_move_cutoffs,
+                "first_move_cutoff_rate": self.first_move_cutoff_rate}
@@ -0,0 +1,167 @@
+"""Generate and load suites of balanced opening positions for tournaments.
+
+`tournament.play_match()` starts every match from two random opening moves,
+which adds to the variance of the results: some random openings strongly
+favor one of the players. An opening suite instead lists the distinct
+openings (the cells of both players' first moves) that are the most
+balanced in self-play, and `tournament.py --openings` plays them in turn.
+
+Openings are deduplicated by the symmetries of the board, which preserve the
+moves of the knight: the reflections and the half turn, plus the quarter
+turns and diagonal reflections of square boards. Each opening is evaluated
+by self-play within a panel of fixed-depth alphabeta agents, using
+`improved_score` and `open_move_score` at each of the given depths: every
+agent of the panel plays the first player against every agent (itself
+included) as the second player. Since every pairing is played in both
+colours, a balanced opening is won by the first player in about half of the
+games, and the openings closest to one half are kept. (A single shallow
+search does not separate openings: at depth 5, most openings of the 7x7
+board score exactly 0.)
+
+Suites are stored as text files with one opening per line, as the row and
+column of the first and second moves (e.g. "2,3 0,5"); lines starting with
+"#" are comments.
+
+Example:
+
+    python opening_suite.py --count 100 --output openings.txt
+    python tournament.py --openings openings.txt
+"""
+
+import argparse
+import math
+
+from isolation import BitBoard
+from game_agent import CustomPlayer
+from sample_players import improved_score
+from sample_players import open_move_score
+
+# The heuristics of the self-play panel
+PANEL_HEURISTICS = (improved_score, open_move_score)
+
+
+def symmetries(width, height):
+    """Return the symmetries of a board of the given size as functions
+    mapping a cell (row, col) to its image.
+    """
+    transforms = [lambda row, col: (row, col),
+                  lambda row, col: (height - 1 - row, col),
+                  lambda row, col: (row, width - 1 - col),
+                  lambda row, col: (height - 1 - row, width - 1 - col)]
+    if width == height:
+        transforms += [lambda row, col: (col, row),
+                       lambda row, col: (width - 1 - col, height - 1 - row),
+                       lambda row, col: (col, height - 1 - row),
+                       lambda row, col: (width - 1 - col, row)]
+    return transforms
+
+
+def canonical(opening, width=7, height=7):
+    """Return the representative of the symmetry class of an opening: the
+    smallest of its images under the symmetries of the board.
+    """
+    return min(tuple(transform(*move) for move in opening) for transform in symmetries(width, height))
+
+
+def evaluate_opening(opening, depths=(1, 2, 3), width=7, height=7):
+    """Return the fraction of the self-play games from an opening that are
+    won by the first player, who moves next.
+
+    Parameters
+    ----------
+    opening : ((int, int), (int, int))
+        The first moves of both players
+
+    depths : sequence<int> (optional)
+        The search depths of the agents of the panel
+
+    width, height : int (optional)
+        The size of the board
+
+    Returns
+    -------
+    float
+        The fraction of games won by the first player
+    """
+    panel = [(depth, score_fn) for depth in depths for score_fn in PANEL_HEURISTICS]
+    wins = 0
+    for first in panel:
+        for second in panel:
+            player_1 = CustomPlayer(first[0], first[1], False, 'alphabeta', inplace=True)
+            player_2 = CustomPlayer(second[0], second[1], False, 'alphabeta', inplace=True)
+            board = BitBoard(player_1, player_2, width, height)
+            for move in opening:
+                board.apply_move(move)
+            winner, _, _ = board.play(time_limit=math.inf)
+            wins += winner == player_1
+    return wins / len(panel) ** 2
+
+
+def generate_suite(count=100, depths=(1, 2, 3), width=7, height=7):
+    """Return the most balanced openings of a board, one per symmetry
+    class.
+
+    Parameters
+    ----------
+    count : int (optional)
+        The number of openings kept
+
+    depths : sequence<int> (optional)
+        The search depths of the agents of the self-play panel
+
+    width, height : int (optional)
+        The size of the board
+
+    Returns
+    -------
+    list<((int, int), (int, int))>
+        The openings kept, most balanced first
+    """
+    cells = [(row, col) for row in range(height) for col in range(width)]
+    openings = sorted({canonical((first, second), width, height)
+                       for first in cells for second in cells if first != second})
+    scored = sorted((abs(evaluate_opening(opening, depths, width, height) - 0.5), opening)
+                    for opening in openings)
+    return [opening for _, opening in scored[:count]]
+
+
+def save_suite(openings, path, comment=None):
+    """Write an opening suite to a text file."""
+    with open(path, "w") as f:
+        if comment:
+            f.write("# {}\n".format(comment))
+        for opening in openings:
+            f.write(" ".join("{},{}".format(*move) for move in opening) + "\n")
+
+
+def load_suite(path):
+    """Return the openings of a suite file as tuples of moves."""
+    openings = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            openings.append(tuple(tuple(int(value) for value in move.split(",")) for move in line.split()))
+    return openings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=100,
+                        help="number of openings kept (default: %(default)s)")
+    parser.add_argument("--depths", type=int, nargs="+", default=[1, 2, 3],
+                        help="search depths of the agents of the self-play panel (default: 1 2 3)")
+    parser.add_argument("--width", type=int, default=7, help="width of the board")
+    parser.add_argument("--height", type=int, default=7, help="height of the board")
+    parser.add_argument("--output", default="openings.txt", help="path of the suite file")
+    args = parser.parse_args()
+
+    openings = generate_suite(args.count, args.depths, args.width, args.height)
+    save_suite(openings, args.output, "{}x{} board, {} most balanced openings in self-play at depths {}".format(
+        args.width, args.height, args.count, " ".join(str(depth) for depth in args.depths)))
+    print("Wrote {} openings to {}".format(len(openings), args.output))
+
+
+if __name__ == "__main__":
+    main()
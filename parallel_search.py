@@ -0,0 +1,408 @@
+"""This file contains the searches that `CustomPlayer` runs in other
+processes: the root-parallel search used when it is created with `processes`
+greater than one, and the pondering search used when it is created with
+`ponder=True`.
+
+The legal moves at the root are split between the workers of a
+`multiprocessing` pool. Every worker runs iterative deepening over its share
+of the root moves and returns the best (score, move) pair found at each depth
+it completed before the deadline. The results are merged at the deepest depth
+completed by all workers, so that the compared scores come from searches of
+the same depth.
+
+Player objects cannot be sent to the workers (they hold pools, threads and
+open files), so the game is sent as a plain tuple (see `encode_board()`) and
+rebuilt in the worker around a search agent owned by that worker. Workers
+keep their agent between calls, together with its transposition table.
+
+The pondering search runs in a single worker process of its own, so that it
+neither holds the interpreter lock of the agents' process nor slows down an
+opponent playing in that process.
+"""
+
+import itertools
+import math
+import multiprocessing
+import os
+import time
+
+from isolation import BitBoard
+
+# Search agents of the current worker process, by configuration key
+_WORKER_PLAYERS = {}
+
+_CONFIG_KEYS = itertools.count()
+
+# Placeholder standing in for the opponent on the boards rebuilt by workers
+OPPONENT = "opponent"
+
+
+def encode_board(game, player):
+    """Return a picklable description of a game from the point of view of
+    one of its players.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        The game state to encode
+
+    player : object
+        The player the description is relative to
+
+    Returns
+    -------
+    tuple
+        A (width, height, move_count, board_state, own_location,
+        opponent_location, own_turn, own_first) tuple
+    """
+    opponent = game.get_opponent(player)
+    return (game.width, game.height, game.move_count, game.__board_state__,
+            game.get_player_location(player), game.get_player_location(opponent),
+            game.active_player == player, game.__player_1__ == player)
+
+
+def decode_board(state, player, opponent=OPPONENT):
+    """Rebuild a game encoded by `encode_board()` as a `BitBoard`.
+
+    Parameters
+    ----------
+    state : tuple
+        The description returned by `encode_board()`
+
+    player : object
+        The player taking the place of the player the description is
+        relative to
+
+    opponent : object (optional)
+        The object taking the place of the opponent
+
+    Returns
+    -------
+    `isolation.BitBoard`
+        The rebuilt game
+    """
+    width, height, move_count, board_state, own, other, own_turn, own_first = state
+    player_1, player_2 = (player, opponent) if own_first else (opponent, player)
+    game = BitBoard(player_1, player_2, width=width, height=height)
+    game.move_count = move_count
+    game.__board_state__ = board_state
+    game.__last_player_move__ = {player: own, opponent: other}
+    if own_turn != own_first:
+        game.__active_player__, game.__inactive_player__ = player_2, player_1
+    game.__hash_key__ = game._compute_hash_key()
+    return game
+
+
+def search_root_moves(config_key, config, state, moves, deadline, depths):
+    """Search a subset of the root moves by iterative deepening in a worker.
+
+    Parameters
+    ----------
+    config_key : int
+        Identifies the configuration, so that each worker builds its search
+        agent only once
+
+    config : dict
+        The keyword arguments used to build the worker's `CustomPlayer`
+
+    state : tuple
+        The root position, as returned by `encode_board()` for the searching
+        player
+
+    moves : list<(int, int)>
+        The root moves searched by this worker
+
+    deadline : float
+        The `time.monotonic()` time at which the search must stop
+
+    depths : list<int>
+        The depths to search, in order
+
+    Returns
+    -------
+    list<(int, float, (int, int))>
+        A (depth, score, move) tuple for every depth completed before the
+        deadline
+    """
+    # imported here since game_agent imports this module
+    from game_agent import CustomPlayer, Timeout
+
+    player = _WORKER_PLAYERS.get(config_key)
+    if player is None:
+        player = _WORKER_PLAYERS[config_key] = CustomPlayer(**config)
+    player.time_left = lambda: 1000 * (deadline - time.monotonic())
+    player.TIMER_THRESHOLD = 0
+    game = player._start_search(decode_board(state, player))
+
+    results = []
+    try:
+        for depth in depths:
+            best_score, best_move = float("-inf"), moves[0]
+            for move in moves:
+                child = game.forecast_move(move)
+                # as in the serial search, children are scored at depth 1
+                # and searched deeper otherwise, where finished games get
+                # their utility
+                if depth <= 1:
+                    score = player.score(child, player)
+                elif player.method == 'minimax':
+                    score, _ = player.minimax(child, depth - 1, maximizing_player=False)
+                else:
+                    score, _ = player.search_method(child, depth - 1, alpha=best_score,
+                                                    maximizing_player=False)
+                if score > best_score:
+                    best_score, best_move = score, move
+            results.append((depth, best_score, best_move))
+    except Timeout:
+        pass
+    return results
+
+
+class RootSplitSearch:
+    """Distribute the root moves of a search over a pool of processes.
+
+    Parameters
+    ----------
+    processes : int
+        The number of worker processes
+
+    config : dict
+        The keyword arguments used by the workers to build their
+        `CustomPlayer`; all values must be picklable
+    """
+
+    def __init__(self, processes, config):
+        self.processes = processes
+        self.config = config
+        self.config_key = next(_CONFIG_KEYS)
+        self.pool = None
+        self.abandoned_pool = None
+        self.depths_completed = []
+
+    def close(self):
+        """Terminate the worker processes; they are started again by the
+        next search.
+        """
+        self.abandon()
+        self.reap()
+
+    def abandon(self):
+        """Give up on the worker processes without waiting for them; the
+        pool is terminated by `reap()` and a new one is started by the next
+        search.
+        """
+        if self.pool is not None:
+            self.reap()
+            self.abandoned_pool, self.pool = self.pool, None
+
+    def reap(self):
+        """Terminate the pool given up on by `abandon()`, if any."""
+        if self.abandoned_pool is not None:
+            self.abandoned_pool.terminate()
+            self.abandoned_pool.join()
+            self.abandoned_pool = None
+
+    def search(self, game, player, time_left, threshold, depths):
+        """Search the root moves of a game in parallel.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            The game state, with `player` to move
+
+        player : object
+            The searching player
+
+        time_left : callable
+            A function that returns the number of milliseconds left in the
+            current turn
+
+        threshold : float
+            The number of milliseconds to keep in reserve for merging the
+            results and returning the move
+
+        depths : list<int>
+            The depths to search, in order
+
+        Returns
+        -------
+        (float, (int, int))
+            The score and best move from the deepest depth completed by all
+            workers; the first legal move with a score of -inf if no depth was
+            completed, and (-1, -1) if there are no legal moves
+        """
+        moves = game.get_legal_moves(player)
+        if not moves:
+            return float("-inf"), (-1, -1)
+        # terminating a pool takes several milliseconds, so a pool abandoned
+        # at the end of the last search is terminated before reading the clock
+        self.reap()
+        if self.pool is None:
+            self.pool = multiprocessing.Pool(self.processes)
+
+        state = encode_board(game, player)
+        start = time.monotonic()
+        deadline = start + (time_left() - threshold) / 1000
+        # the main process waits for the results until half the threshold is
+        # left, which leaves the workers time to send them back
+        wait_until = start + (time_left() - threshold / 2) / 1000
+        shares = [moves[i::self.processes] for i in range(self.processes)]
+        pending = [self.pool.apply_async(search_root_moves,
+                                         (self.config_key, self.config, state, share, deadline, depths))
+                   for share in shares if share]
+
+        results = []
+        for async_result in pending:
+            timeout = max(0., wait_until - time.monotonic())
+            try:
+                results.append(async_result.get(None if math.isinf(timeout) else timeout))
+            except multiprocessing.TimeoutError:
+                # a worker missed the deadline; restart the pool rather than
+                # let its search run into the next move, but leave terminating
+                # it to the next search since the clock is nearly out
+                self.abandon()
+                break
+        if len(results) < len(pending):
+            results = [result for result in results if result]
+            if not results:
+                return float("-inf"), moves[0]
+
+        completed = min(len(result) for result in results)
+        self.depths_completed.append(results[0][completed - 1][0] if completed else 0)
+        if not completed:
+            return float("-inf"), moves[0]
+        _, score, move = max((result[completed - 1] for result in results),
+                             key=lambda entry: (entry[1], entry[2]))
+        return score, move
+
+
+def ponder_worker(config, connection, stop):
+    """Run the pondering searches requested by a `PonderSearch`.
+
+    The worker receives a position encoded by `encode_board()`, searches it
+    by iterative deepening and sends the `SearchResult` of every completed
+    iteration, followed once the search has stopped by the list of the
+    transposition table entries it stored (see
+    `TranspositionTable.export()`). The first iteration always completes,
+    so every search sends at least one result; the following ones stop as
+    soon as `stop` is set. The worker exits when it receives None.
+
+    Parameters
+    ----------
+    config : dict
+        The keyword arguments used to build the worker's `CustomPlayer`
+
+    connection : `multiprocessing.connection.Connection`
+        The worker's end of the pipe to the `PonderSearch`
+
+    stop : `multiprocessing.Event`
+        Set by the `PonderSearch` to end the current search
+    """
+    # imported here since game_agent imports this module
+    from game_agent import CustomPlayer, Timeout
+
+    # run in the background of the agents' own searches, which may share
+    # the cores of this machine
+    if hasattr(os, "nice"):
+        os.nice(19)
+    player = CustomPlayer(**config)
+    completed = 0
+
+    def time_left():
+        return -math.inf if completed and stop.is_set() else math.inf
+
+    player.time_left = time_left
+    while True:
+        state = connection.recv()
+        if state is None:
+            return
+        game = decode_board(state, player)
+        completed = 0
+        try:
+            for result in player._iterations(player._start_search(game)):
+                connection.send(result)
+                completed += 1
+        except Timeout:
+            pass
+        # entries next to the leaves are cheap to recompute and make up most
+        # of the table, so they are not worth sending
+        connection.send(player.tt.export(min_depth=2))
+
+
+class PonderSearch:
+    """Search a position in a worker process while the opponent is thinking.
+
+    Parameters
+    ----------
+    config : dict
+        The keyword arguments used by the worker to build its
+        `CustomPlayer`; all values must be picklable
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.process = None
+        self.connection = None
+        self.stop_event = None
+        self.running = False
+
+    def close(self):
+        """Stop the worker process; it is started again by the next search."""
+        if self.process is not None:
+            self.stop()
+            self.connection.send(None)
+            self.process.join()
+            self.connection.close()
+            self.process = None
+
+    def open(self):
+        """Start the worker process unless it is running. Starting it takes
+        several milliseconds, so agents open it while their own clock runs
+        rather than after choosing their move.
+        """
+        if self.process is None:
+            self.connection, child_connection = multiprocessing.Pipe()
+            self.stop_event = multiprocessing.Event()
+            self.process = multiprocessing.Process(target=ponder_worker,
+                                                   args=(self.config, child_connection, self.stop_event))
+            self.process.daemon = True
+            self.process.start()
+            child_connection.close()
+
+    def start(self, game, player):
+        """Start searching a game in the worker.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            The game state to search, with `player` to move
+
+        player : object
+            The player searching the game
+        """
+        self.open()
+        self.stop_event.clear()
+        self.connection.send(encode_board(game, player))
+        self.running = True
+
+    def stop(self):
+        """Stop the current search once its first iteration is completed.
+
+        Returns
+        -------
+        (`game_agent.SearchResult`, list<tuple>)
+            The result of the deepest iteration completed and the
+            transposition table entries of the search, or None if no search
+            is running
+        """
+        if not self.running:
+            return None
+        self.stop_event.set()
+        last = None
+        while True:
+            message = self.connection.recv()
+            if isinstance(message, list):
+                break
+            last = message
+        self.running = False
+        return last, message
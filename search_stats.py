@@ -0,0 +1,121 @@
+"""This file contains `SearchStats`, an in-memory collector of statistics about
+the searches run by `CustomPlayer`.
+
+A collector passed to `CustomPlayer(stats=...)` receives one record per call
+to get_move(): the number of nodes searched, leaf evaluations and cutoffs,
+the deepest iteration completed, the duration and node count of every
+iteration and the effective branching factor. Records are plain dicts kept in
+memory until they are exported with `export_jsonl()` or `export_csv()`, e.g.
+at the end of a tournament. Agents created without a collector do no
+bookkeeping at all.
+"""
+
+import csv
+import json
+
+# Columns of the records, in the order of the CSV export
+FIELDS = ["label", "move_count", "legal_moves", "depth", "nodes", "leaf_evaluations",
+          "cutoffs", "time", "iteration_times", "iteration_nodes", "branching_factor"]
+
+
+class SearchStats:
+    """Collect one record of statistics per search.
+
+    Parameters
+    ----------
+    label : str (optional)
+        A name stored in every record, e.g. the name of the agent in a
+        tournament
+    """
+
+    def __init__(self, label=None):
+        self.label = label
+        self.records = []
+        self.leaf_evaluations = 0
+        self._current = None
+        self._start = None
+        self._last_nodes = 0
+
+    def counting(self, score_fn):
+        """Wrap an evaluation function to count the leaf evaluations."""
+        def score(game, player):
+            self.leaf_evaluations += 1
+            return score_fn(game, player)
+        score.__name__ = getattr(score_fn, "__name__", "score")
+        return score
+
+    def start_search(self, game, legal_moves, nodes, cutoffs):
+        """Start the record of a search.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            The game state searched
+
+        legal_moves : list<(int, int)>
+            The legal moves of the searching player
+
+        nodes : int
+            The searching agent's node counter at the start of the search
+
+        cutoffs : int
+            The searching agent's cutoff counter at the start of the search
+        """
+        self._current = {"label": self.label,
+                         "move_count": game.move_count,
+                         "legal_moves": len(legal_moves),
+                         "depth": 0,
+                         "iteration_times": [],
+                         "iteration_nodes": []}
+        self._start = (nodes, self.leaf_evaluations, cutoffs)
+        self._last_nodes = nodes
+
+    def record_iteration(self, depth, elapsed, nodes):
+        """Record a completed iteration of depth `depth` that took `elapsed`
+        milliseconds; `nodes` is the agent's node counter after it.
+        """
+        self._current["depth"] = depth
+        self._current["iteration_times"].append(elapsed)
+        self._current["iteration_nodes"].append(nodes - self._last_nodes)
+        self._last_nodes = nodes
+
+    def end_search(self, elapsed, nodes, cutoffs):
+        """Complete the record of a search that took `elapsed` milliseconds;
+        `nodes` and `cutoffs` are the agent's counters at the end.
+        """
+        record = self._current
+        start_nodes, start_evaluations, start_cutoffs = self._start
+        record["nodes"] = nodes - start_nodes
+        record["leaf_evaluations"] = self.leaf_evaluations - start_evaluations
+        record["cutoffs"] = cutoffs - start_cutoffs
+        record["time"] = elapsed
+        iteration_nodes = record["iteration_nodes"]
+        if len(iteration_nodes) > 1 and iteration_nodes[-2]:
+            record["branching_factor"] = iteration_nodes[-1] / iteration_nodes[-2]
+        else:
+            record["branching_factor"] = None
+        self.records.append(record)
+        self._current = None
+
+
+def export_jsonl(records, path):
+    """Write records to a file with one JSON object per line; non-finite
+    numbers, which standard JSON cannot represent, raise ValueError.
+    """
+    with open(path, "w") as f:
+        for record in records:
+            f.write(json.dumps(record, allow_nan=False) + "\n")
+
+
+def export_csv(records, path):
+    """Write records to a CSV file; per-iteration lists are written as
+    space-separated values.
+    """
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        for record in records:
+            row = dict(record)
+            for field in ("iteration_times", "iteration_nodes"):
+                row[field] = " ".join(str(value) for value in record[field])
+            writer.writerow(row)
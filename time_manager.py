@@ -0,0 +1,170 @@
+"""This file contains the time manager used by `CustomPlayer` to decide when
+iterative deepening should stop.
+
+Without a time manager, iterative deepening runs until the search raises
+`Timeout`, so the time spent on the last, unfinished iteration is wasted.
+`TimeManager` predicts the duration of the next iteration as the duration of
+the previous one multiplied by the effective branching factor: the ratio
+between the durations of the last two iterations of the current search, or a
+running average over earlier searches while fewer than two iterations have
+been timed. It declines to start iterations that would not finish before
+the timer threshold. In critical positions, where the best move changed or
+the score dropped in the last iteration, it starts the next iteration even
+when the prediction exceeds the time left by up to `critical_extension`,
+since predictions overestimate as often as they underestimate. Once an
+iteration proves a win or a loss, deeper iterations cannot change the result
+and none is started.
+
+Every iteration is logged as an `IterationRecord` so the predictions can be
+compared with the actual durations.
+"""
+
+import math
+
+from collections import namedtuple
+
+# The status of an iteration: completed, aborted by Timeout, or never started
+COMPLETED = "completed"
+ABORTED = "aborted"
+DECLINED = "declined"
+
+IterationRecord = namedtuple("IterationRecord", ["depth", "predicted", "actual", "status"])
+
+
+class TimeManager:
+    """Decide whether iterative deepening should start another iteration.
+
+    Parameters
+    ----------
+    branching_factor : float (optional)
+        The initial value of the running average of the effective branching
+        factor
+
+    smoothing : float (optional)
+        The weight of the latest observation in the running estimate of the
+        effective branching factor
+
+    critical_extension : float (optional)
+        The factor by which a predicted duration may exceed the time left in
+        critical positions
+
+    max_records : int (optional)
+        The number of iteration records kept in `log`
+    """
+
+    def __init__(self, branching_factor=4., smoothing=0.25, critical_extension=1.5,
+                 max_records=10000):
+        self.branching_factor = branching_factor
+        self.smoothing = smoothing
+        self.critical_extension = critical_extension
+        self.max_records = max_records
+        self.log = []
+        self._last_time = None
+        self._ratio = None
+        self._last_score = None
+        self._last_move = None
+        self._critical = False
+
+    def new_search(self):
+        """Prepare for the iterations of a new call to get_move()."""
+        self._last_time = None
+        self._ratio = None
+        self._last_score = None
+        self._last_move = None
+        self._critical = False
+
+    def predict(self):
+        """Return the predicted duration of the next iteration in
+        milliseconds, or None if no iteration has been timed in this search.
+        """
+        if self._last_time is None:
+            return None
+        if self._ratio is not None:
+            return self._last_time * self._ratio
+        return self._last_time * self.branching_factor
+
+    def should_search(self, depth, time_left, threshold):
+        """Test whether the next iteration is expected to finish in time.
+
+        Parameters
+        ----------
+        depth : int
+            The depth of the next iteration
+
+        time_left : float
+            The number of milliseconds left in the turn
+
+        threshold : float
+            The number of milliseconds at which the search times out
+
+        Returns
+        -------
+        bool
+            False if the iteration should not be started
+        """
+        if self._last_score is not None and math.isinf(self._last_score):
+            return False
+        predicted = self.predict()
+        if predicted is None:
+            return True
+        available = time_left - threshold
+        if self._critical:
+            available *= self.critical_extension
+        if predicted <= available:
+            return True
+        self._record(depth, predicted, None, DECLINED)
+        return False
+
+    def record_iteration(self, depth, elapsed, score, move):
+        """Record an iteration that completed.
+
+        Parameters
+        ----------
+        depth : int
+            The depth of the iteration
+
+        elapsed : float
+            The duration of the iteration in milliseconds
+
+        score : float
+            The score returned by the iteration
+
+        move : tuple(int, int)
+            The best move returned by the iteration
+        """
+        self._record(depth, self.predict(), elapsed, COMPLETED)
+        # durations below a millisecond are dominated by noise
+        if self._last_time is not None and self._last_time >= 1.:
+            self._ratio = max(1., elapsed / self._last_time)
+            self.branching_factor += self.smoothing * (self._ratio - self.branching_factor)
+        self._critical = self._last_move is not None and \
+            (move != self._last_move or score < self._last_score)
+        self._last_time = elapsed
+        self._last_score = score
+        self._last_move = move
+
+    def record_timeout(self, depth, elapsed):
+        """Record an iteration aborted by Timeout after `elapsed`
+        milliseconds.
+        """
+        self._record(depth, self.predict(), elapsed, ABORTED)
+
+    def _record(self, depth, predicted, actual, status):
+        self.log.append(IterationRecord(depth, predicted, actual, status))
+        if len(self.log) > self.max_records:
+            del self.log[:len(self.log) - self.max_records]
+
+    def stats(self):
+        """Return the counts of completed, aborted and declined iterations,
+        the mean relative error of the predicted durations of completed
+        iterations, and the total time spent in aborted iterations, as a
+        dict.
+        """
+        errors = [abs(record.predicted - record.actual) / record.actual for record in self.log
+                  if record.status == COMPLETED and record.predicted is not None and record.actual > 0]
+        return {"completed": sum(1 for record in self.log if record.status == COMPLETED),
+                "aborted": sum(1 for record in self.log if record.status == ABORTED),
+                "declined": sum(1 for record in self.log if record.status == DECLINED),
+                "mean_prediction_error": sum(errors) / len(errors) if errors else 0.,
+                "wasted_time": sum(record.actual for record in self.log if record.status == ABORTED),
+                "branching_factor": self.branching_factor}
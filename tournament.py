@@ -17,12 +17,52 @@ For example, if the random moves chosen for initialization are (5, 2) and
 agentB at (1, 3) as player 2 then play to conclusion; the agents swap
 initiative in the second match with agentB at (5, 2) as player 1 and agentA at
 (1, 3) as player 2.
+
+With --processes, the matches of each round are played in parallel by a
+pool of worker processes, each playing whole matches with its own copies of
+the agents; --pin additionally pins every worker to its own CPU core so that
+the agents of concurrent matches do not share a core within their time
+limits. Every match is played with its own random seed, derived from --seed
+and the names of the agents, in both modes, so the parallel tournament plays
+the same distribution of games as the sequential one.
+
+With --results, every completed match (the agents, seed, openings, winners,
+termination reasons and move histories) is appended to a JSON lines log as
+soon as it completes. Running again with --resume and the same log skips the
+matches already recorded and plays only the missing ones, so an interrupted
+tournament loses at most the matches in progress. The log starts with the
+settings that change how matches are played (the seed, the openings, the
+time limit and the budgets); resuming with different settings is refused,
+and so is starting a new tournament over a non-empty log without
+--overwrite.
+
+The results against each opponent, and overall, are reported with the
+estimated Elo difference and its 95% confidence interval. With --sprt, the
+matches against an opponent stop as soon as a sequential probability ratio
+test (see `elo.py`) establishes whether the evaluated agent is --elo1 points
+stronger or only --elo0 points, which saves most of the matches against
+clearly stronger or weaker opponents.
+
+With --openings, the matches against every opponent start from the balanced
+openings of a suite file (see `opening_suite.py`) in turn, rather than from
+random openings, which lowers the variance of the results.
+
+With --node-budget, the evaluated agents search a fixed number of nodes per
+move (and the MCTS agent a fixed number of iterations) instead of searching
+until their time runs out, and moves are no longer timed. The results then
+no longer depend on the speed or the load of the machine, so they are
+reproducible and many matches can run concurrently on a loaded host.
 """
 
+import argparse
 import itertools
+import json
+import multiprocessing
+import os
 import random
 import warnings
 
+from collections import deque
 from collections import namedtuple
 
 from isolation import Board
@@ -34,9 +74,17 @@ from game_agent import CustomPlayer
 from game_agent import free_spaces_around_player
 from game_agent import free_spaces_around_player_improved
 from game_agent import free_spaces_around_player_minus_length
+from mcts_player import MCTSPlayer
+from search_stats import SearchStats
+from search_stats import export_csv
+from search_stats import export_jsonl
+from elo import SPRT
+from elo import elo_interval
+from opening_suite import load_suite
 
 NUM_MATCHES = 20  # number of matches against each opponent
 TIME_LIMIT = 150  # number of milliseconds before timeout
+BOARD_ENGINE = Board  # board class used for matches (Board or BitBoard)
 
 TIMEOUT_WARNING = "One or more agents lost a match this round due to " + \
                   "timeout. The get_move() function must return before " + \
@@ -57,29 +105,48 @@ same opponents.
 """
 
 Agent = namedtuple("Agent", ["player", "name"])
+RoundResult = namedtuple("RoundResult", ["win_ratio", "wins", "losses"])
 
 
-def play_match(player1, player2):
+def play_match(player1, player2, engine=Board, game_records=None, opening=None, time_limit=None):
     """
     Play a "fair" set of matches between two agents by playing two games
     between the players, forcing each agent to play from randomly selected
     positions. This should control for differences in outcome resulting from
-    advantage due to starting position on the board.
+    advantage due to starting position on the board. The games are played on
+    boards of the class `engine` (e.g., `isolation.Board` or
+    `isolation.BitBoard`). If `game_records` is a list, a dict describing
+    each game (the opening moves, which of the players moved first and won,
+    the termination reason and the move history) is appended to it. If
+    `opening` is a pair of moves, the games start with these moves instead
+    of random ones. Moves are timed with `time_limit` milliseconds, or
+    `TIME_LIMIT` if None.
     """
+    if time_limit is None:
+        time_limit = TIME_LIMIT
     num_wins = {player1: 0, player2: 0}
     num_timeouts = {player1: 0, player2: 0}
     num_invalid_moves = {player1: 0, player2: 0}
-    games = [Board(player1, player2), Board(player2, player1)]
-
-    # initialize both games with a random move and response
-    for _ in range(2):
-        move = random.choice(games[0].get_legal_moves())
+    games = [engine(player1, player2), engine(player2, player1)]
+
+    # initialize both games with a random move and response, or with the
+    # moves of the opening
+    opening_moves = []
+    for index in range(2):
+        move = opening[index] if opening is not None else random.choice(games[0].get_legal_moves())
+        opening_moves.append(move)
         games[0].apply_move(move)
         games[1].apply_move(move)
 
     # play both games and tally the results
     for game in games:
-        winner, _, termination = game.play(time_limit=TIME_LIMIT)
+        winner, move_history, termination = game.play(time_limit=time_limit)
+        if game_records is not None:
+            game_records.append({"opening": opening_moves,
+                                 "first": 1 if game.__player_1__ == player1 else 2,
+                                 "winner": 1 if winner == player1 else 2,
+                                 "termination": termination,
+                                 "history": move_history})
 
         if player1 == winner:
             num_wins[player1] += 1
@@ -104,9 +171,198 @@ def play_match(player1, player2):
     return num_wins[player1], num_wins[player2]
 
 
-def play_round(agents, num_matches):
+def match_seed(seed, key):
+    """
+    Return the seed of the random openings of the match identified by
+    `key` in a tournament seeded with `seed`.
+    """
+    return random.Random("{}|{}".format(seed, key)).getrandbits(32)
+
+
+def play_seeded_match(task):
+    """
+    Play a "fair" match described by a (player1, player2, seed, engine,
+    opening, time_limit) tuple, seeding the random openings with `seed`
+    unless an opening is given. The time limit travels with the task since
+    worker processes started by spawn or forkserver do not share the
+    module globals of the main process. Return the scores of both players
+    and the records of the games (see `play_match()`).
     """
-    Play one round (i.e., a single match between each pair of opponents)
+    player1, player2, seed, engine, opening, time_limit = task
+    random.seed(seed)
+    game_records = []
+    score_1, score_2 = play_match(player1, player2, engine, game_records, opening, time_limit)
+    return score_1, score_2, game_records
+
+
+def play_pooled_match(task):
+    """
+    Play a match of `play_seeded_match()` in a worker process, and also
+    return the search statistics that the copies of the players collected
+    during the match so that they can be merged into the original players.
+    """
+    player1, player2 = task[:2]
+    starts = [len(player.stats.records) if getattr(player, "stats", None) else 0
+              for player in (player1, player2)]
+    score_1, score_2, game_records = play_seeded_match(task)
+    records = [player.stats.records[start:] if getattr(player, "stats", None) else []
+               for player, start in zip((player1, player2), starts)]
+    return score_1, score_2, game_records, records
+
+
+class ResultsLog:
+    """
+    A durable log of completed matches holding one JSON object per line.
+    Every match is written and flushed to disk as soon as it completes, so a
+    tournament interrupted at any point can be resumed from the log without
+    playing the recorded matches again.
+
+    The first line of the log is a header record holding the configuration
+    of the run, which must match the configuration of a resumed run.
+
+    Parameters
+    ----------
+    path : str
+        The path of the log file
+
+    resume : bool (optional)
+        Flag indicating whether to keep the matches already recorded in the
+        file (True) or to start a new log (False)
+
+    config : dict (optional)
+        The settings of the run that change how the matches are played; must
+        be JSON serializable
+
+    overwrite : bool (optional)
+        Flag allowing a new log to replace a non-empty file
+
+    Raises
+    ------
+    FileExistsError
+        When starting a new log over a non-empty file without `overwrite`
+
+    ValueError
+        When resuming a log recorded with a different configuration
+    """
+
+    def __init__(self, path, resume=False, config=None, overwrite=False):
+        self.path = path
+        self.config = json.loads(json.dumps(config or {}))
+        self.completed = {}
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+        if exists and not resume and not overwrite:
+            raise FileExistsError("{} already holds results; resume or overwrite it".format(path))
+        header = None
+        if resume and exists:
+            valid_end = 0
+            with open(path, "rb") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # a line cut short by an interruption, and the end
+                        # of the valid log
+                        break
+                    if header is None:
+                        header = record
+                        if header.get("config") != self.config:
+                            raise ValueError("{} was recorded with a different configuration: {}".format(
+                                path, header.get("config")))
+                    else:
+                        self.completed[record["key"]] = record
+                    valid_end += len(line)
+            with open(path, "r+b") as f:
+                f.truncate(valid_end)
+        self.file = open(path, "a" if resume else "w")
+        if header is None:
+            self._write({"config": self.config})
+
+    def _write(self, record):
+        """Write a record to the log and flush it to disk."""
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def append(self, record):
+        """Write the record of a completed match to the log."""
+        self.completed[record["key"]] = record
+        self._write(record)
+
+    def close(self):
+        self.file.close()
+
+
+def pin_worker(cores):
+    """
+    Pool initializer pinning the worker process to one of the CPU cores
+    taken from the queue `cores`.
+    """
+    os.sched_setaffinity(0, {cores.get()})
+
+
+def make_pool(processes, pin=False):
+    """
+    Return a pool of `processes` worker processes playing matches, pinned
+    to distinct CPU cores if `pin` is set and the platform supports it.
+    """
+    if not pin or not hasattr(os, "sched_setaffinity"):
+        return multiprocessing.Pool(processes)
+    available = sorted(os.sched_getaffinity(0))
+    cores = multiprocessing.Queue()
+    for index in range(processes):
+        cores.put(available[index % len(available)])
+    return multiprocessing.Pool(processes, initializer=pin_worker, initargs=(cores,))
+
+
+def imap_window(pool, function, tasks, window):
+    """
+    Yield `function(task)` for every task in order, computed by the workers
+    of `pool` with at most `window` tasks submitted ahead of the results
+    consumed, so that a consumer that stops early leaves little work behind.
+    """
+    pending = deque()
+    for task in tasks:
+        pending.append(pool.apply_async(function, (task,)))
+        if len(pending) >= window:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+def format_elo(wins, losses):
+    """
+    Format the Elo difference estimated from game results with its 95%
+    confidence interval.
+    """
+    elo, low, high = elo_interval(wins, losses)
+    return "{:+.0f} [{:+.0f}, {:+.0f}]".format(elo + 0., low + 0., high + 0.)
+
+
+def play_round(agents, num_matches, engine=Board, pool=None, log=None, seed=0, sprt=None,
+               openings=None, time_limit=None):
+    """
+    Play one round (i.e., a single match between each pair of opponents).
+    The matches are played by the worker processes of `pool` if supplied,
+    and sequentially otherwise.
+
+    Every match is identified by a key made of the agent names, and its
+    openings are seeded from the key and the tournament `seed`. If a
+    `ResultsLog` is supplied, matches whose key it already holds are not
+    played again, and the other matches are recorded in it as they complete.
+
+    If an `elo.SPRT` is supplied, the matches against an opponent stop as
+    soon as the test accepts a hypothesis; `num_matches` is then the
+    maximum number of matches per opponent and order of play.
+
+    If a list of `openings` is supplied (see `opening_suite.py`), the
+    matches against every opponent start from these openings in turn
+    instead of random ones.
+
+    Moves are timed with `time_limit` milliseconds, or `TIME_LIMIT` if None.
+
+    Returns a `RoundResult` with the percentage of games won by the
+    evaluated agent (the last of `agents`) and its numbers of wins and
+    losses.
     """
     agent_1 = agents[-1]
     wins = 0.
@@ -119,31 +375,130 @@ def play_round(agents, num_matches):
 
         counts = {agent_1.player: 0., agent_2.player: 0.}
         names = [agent_1.name, agent_2.name]
-        print("  Match {}: {!s:^11} vs {!s:^11}".format(idx + 1, *names), end=' ')
-
-        # Each player takes a turn going first
-        for p1, p2 in itertools.permutations((agent_1.player, agent_2.player)):
-            for _ in range(num_matches):
-                score_1, score_2 = play_match(p1, p2)
-                counts[p1] += score_1
-                counts[p2] += score_2
-                total += score_1 + score_2
+        print("  Match {}: {!s:^11} vs {!s:^11}".format(idx + 1, *names), end=' ', flush=True)
+
+        # Each player takes a turn going first, alternately so that the
+        # matches played before an early stop are balanced
+        matches = []
+        for index in range(num_matches):
+            for a1, a2 in itertools.permutations((agent_1, agent_2)):
+                key = "|".join((agent_1.name, agent_2.name, a1.name, a2.name, str(index)))
+                matches.append((key, a1, a2))
+        tasks = [(a1.player, a2.player, match_seed(seed, key), engine,
+                  openings[index % len(openings)] if openings else None, time_limit)
+                 for index, (key, a1, a2) in enumerate(matches)
+                 if log is None or key not in log.completed]
+        if pool is None:
+            results = map(play_seeded_match, tasks)
+        else:
+            results = imap_window(pool, play_pooled_match, tasks, 2 * multiprocessing.cpu_count())
+
+        decision = None
+        for key, a1, a2 in matches:
+            p1, p2 = a1.player, a2.player
+            if log is not None and key in log.completed:
+                score_1, score_2 = log.completed[key]["scores"]
+            else:
+                result = next(results)
+                score_1, score_2, game_records = result[:3]
+                if pool is not None:
+                    for player, records in zip((p1, p2), result[3]):
+                        if records:
+                            player.stats.records.extend(records)
+                if log is not None:
+                    log.append({"key": key,
+                                "agent": agent_1.name,
+                                "opponent": agent_2.name,
+                                "player_1": a1.name,
+                                "player_2": a2.name,
+                                "seed": match_seed(seed, key),
+                                "scores": [score_1, score_2],
+                                "games": game_records})
+            counts[p1] += score_1
+            counts[p2] += score_2
+            if sprt is not None:
+                decision = sprt.status(counts[agent_1.player], counts[agent_2.player])
+                if decision is not None:
+                    break
 
         wins += counts[agent_1.player]
+        total += counts[agent_1.player] + counts[agent_2.player]
 
-        print("\tResult: {} to {}".format(int(counts[agent_1.player]),
-                                          int(counts[agent_2.player])))
+        result = "\tResult: {} to {}\tElo {}".format(int(counts[agent_1.player]), int(counts[agent_2.player]),
+                                                     format_elo(counts[agent_1.player], counts[agent_2.player]))
+        if decision is not None:
+            result += "\tSPRT: {} accepted".format(decision)
+        print(result)
 
-    return 100. * wins / total
+    return RoundResult(100. * wins / total, int(wins), int(total - wins))
 
 
 def main():
+    parser = argparse.ArgumentParser(description=DESCRIPTION)
+    parser.add_argument("--stats", metavar="PATH",
+                        help="collect search statistics of the evaluated agents and write them "
+                             "to PATH, as CSV if PATH ends with .csv and as JSON lines otherwise")
+    parser.add_argument("--weights", metavar="PATH",
+                        help="also evaluate an agent using the feature weights of a tune.py checkpoint")
+    parser.add_argument("--processes", type=int, default=1,
+                        help="number of worker processes playing matches in parallel; "
+                             "0 uses one per CPU core (default: 1, sequential)")
+    parser.add_argument("--pin", action="store_true",
+                        help="pin each worker process to its own CPU core")
+    parser.add_argument("--results", metavar="PATH",
+                        help="record every completed match to PATH, one JSON object per line")
+    parser.add_argument("--resume", action="store_true",
+                        help="keep the matches already recorded in the --results file and play "
+                             "only the missing ones")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="replace the matches already recorded in the --results file")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the random openings of the matches")
+    parser.add_argument("--openings", metavar="PATH",
+                        help="start the matches from the openings of a suite generated by "
+                             "opening_suite.py, in turn, instead of random openings")
+    parser.add_argument("--matches", type=int, default=NUM_MATCHES,
+                        help="number of matches against each opponent in each order of play, "
+                             "or maximum number with --sprt (default: %(default)s)")
+    parser.add_argument("--sprt", action="store_true",
+                        help="stop playing an opponent once a sequential probability ratio test "
+                             "settles whether the evaluated agent is stronger by --elo1 or by --elo0")
+    parser.add_argument("--elo0", type=float, default=0.,
+                        help="Elo difference of the SPRT null hypothesis (default: %(default)s)")
+    parser.add_argument("--elo1", type=float, default=100.,
+                        help="Elo difference of the SPRT alternative hypothesis (default: %(default)s)")
+    parser.add_argument("--alpha", type=float, default=0.05,
+                        help="SPRT probability of accepting --elo1 when --elo0 holds (default: %(default)s)")
+    parser.add_argument("--beta", type=float, default=0.05,
+                        help="SPRT probability of accepting --elo0 when --elo1 holds (default: %(default)s)")
+    parser.add_argument("--node-budget", type=int, metavar="NODES",
+                        help="search a fixed number of nodes per move in the evaluated agents "
+                             "instead of timing their moves, which makes the results independent "
+                             "of the speed and load of the machine")
+    parser.add_argument("--mcts-iterations", type=int, default=1000,
+                        help="number of iterations per move of the MCTS agent with --node-budget "
+                             "(default: %(default)s)")
+    args = parser.parse_args()
+    if args.resume and not args.results:
+        parser.error("--resume requires --results")
+    time_limit = TIME_LIMIT
+    if args.node_budget:
+        # every agent stops on its own: the evaluated agents after their
+        # budget and the opponents at their fixed depth
+        time_limit = float("inf")
+
+    def collector(name):
+        return SearchStats(name) if args.stats else None
+
     HEURISTICS = [("Null", null_score),
                   ("Open", open_move_score),
                   ("Improved", improved_score)]
     AB_ARGS = {"search_depth": 5, "method": 'alphabeta', "iterative": False}
     MM_ARGS = {"search_depth": 3, "method": 'minimax', "iterative": False}
-    CUSTOM_ARGS = {"method": 'alphabeta', 'iterative': True}
+    # the endgame solver is shared by all the ID agents, so that the
+    # ID_Improved baseline differs from the others only in the heuristic
+    CUSTOM_ARGS = {"method": 'alphabeta', 'iterative': True, "node_budget": args.node_budget,
+                   "endgame": True}
 
     # Create a collection of CPU agents using fixed-depth minimax or alpha beta
     # search, or random selection.  The agent names encode the search method
@@ -161,31 +516,71 @@ def main():
     # systems; i.e., the performance of the student agent is considered
     # relative to the performance of the ID_Improved agent to account for
     # faster or slower computers.
-    test_agents = [Agent(CustomPlayer(score_fn=improved_score, **CUSTOM_ARGS), "ID_Improved"),
-                   Agent(CustomPlayer(score_fn=free_spaces_around_player, **CUSTOM_ARGS), "Blank"),
-                   Agent(CustomPlayer(score_fn=free_spaces_around_player_minus_length, **CUSTOM_ARGS),
+    test_agents = [Agent(CustomPlayer(score_fn=improved_score, stats=collector("ID_Improved"),
+                                      **CUSTOM_ARGS), "ID_Improved"),
+                   Agent(CustomPlayer(score_fn=free_spaces_around_player, stats=collector("Blank"),
+                                      **CUSTOM_ARGS), "Blank"),
+                   Agent(CustomPlayer(score_fn=free_spaces_around_player_minus_length,
+                                      stats=collector("Blank IMP"), **CUSTOM_ARGS),
                          "Blank IMP"),
-                   Agent(CustomPlayer(score_fn=free_spaces_around_player_improved, **CUSTOM_ARGS),
-                         "Blank MOV")
+                   Agent(CustomPlayer(score_fn=free_spaces_around_player_improved,
+                                      stats=collector("Blank MOV"), **CUSTOM_ARGS),
+                         "Blank MOV"),
+                   Agent(MCTSPlayer(iteration_budget=args.mcts_iterations if args.node_budget else None),
+                         "MCTS")
                    ]
+    if args.weights:
+        from tune import tuned_engine
+        test_agents.append(Agent(CustomPlayer(score_fn=tuned_engine(args.weights), stats=collector("Tuned"),
+                                              **CUSTOM_ARGS), "Tuned"))
     # test_agents = [Agent(CustomPlayer(score_fn=free_spaces_around_player_minus_length, **CUSTOM_ARGS),  "Student Free Space")]
 
 
 
+    openings = load_suite(args.openings) if args.openings else None
+    log = None
+    if args.results:
+        config = {"seed": args.seed, "openings": openings, "time_limit": time_limit,
+                  "node_budget": args.node_budget,
+                  "mcts_iterations": args.mcts_iterations if args.node_budget else None,
+                  "weights": args.weights}
+        try:
+            log = ResultsLog(args.results, args.resume, config, args.overwrite)
+        except (FileExistsError, ValueError) as error:
+            parser.error(str(error))
+    processes = args.processes or multiprocessing.cpu_count()
+    pool = make_pool(processes, args.pin) if processes > 1 else None
+    sprt = SPRT(args.elo0, args.elo1, args.alpha, args.beta) if args.sprt else None
+
     print(DESCRIPTION)
-    for agentUT in test_agents:
-        print("")
-        print("*************************")
-        print("{:^25}".format("Evaluating: " + agentUT.name))
-        print("*************************")
-
-        agents = random_agents + mm_agents + ab_agents + [agentUT]
-        # agents = ab_agents + [agentUT]
-        win_ratio = play_round(agents, NUM_MATCHES)
-
-        print("\n\nResults:")
-        print("----------")
-        print("{!s:<15}{:>10.2f}%".format(agentUT.name, win_ratio))
+    try:
+        for agentUT in test_agents:
+            print("")
+            print("*************************")
+            print("{:^25}".format("Evaluating: " + agentUT.name))
+            print("*************************")
+
+            agents = random_agents + mm_agents + ab_agents + [agentUT]
+            # agents = ab_agents + [agentUT]
+            result = play_round(agents, args.matches, BOARD_ENGINE, pool, log, args.seed, sprt, openings,
+                                time_limit)
+
+            print("\n\nResults:")
+            print("----------")
+            print("{!s:<15}{:>10.2f}%\tElo {}".format(agentUT.name, result.win_ratio,
+                                                     format_elo(result.wins, result.losses)))
+    finally:
+        if pool is not None:
+            pool.terminate()
+        if log is not None:
+            log.close()
+
+    if args.stats:
+        records = [record for agent in test_agents if getattr(agent.player, "stats", None)
+                   for record in agent.player.stats.records]
+        export = export_csv if args.stats.endswith(".csv") else export_jsonl
+        export(records, args.stats)
+        print("\nWrote {} search records to {}".format(len(records), args.stats))
 
 
 if __name__ == "__main__":
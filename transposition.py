@@ -0,0 +1,199 @@
+"""This file contains the transposition table used by `CustomPlayer` to cache
+search results for positions that are reached through different move orders
+or revisited by successive iterations of iterative deepening.
+
+Entries are keyed by the Zobrist key of a position (see `Board.hash_key`) and
+record the remaining search depth, the value found, whether that value is
+exact or a lower/upper bound, and the best move. The table holds a fixed
+number of buckets with two slots each: a depth-preferred slot that keeps the
+deepest result from the current search, and an always-replace slot that keeps
+the most recent one.
+"""
+
+# Bound types of a stored value
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# Mixed into the position key when the searching player is player 2, since
+# scores are stored from the point of view of the searching player
+PERSPECTIVE_KEY = 0x9e3779b97f4a7c15
+
+# Entries are plain (key, depth, value, flag, move, age) tuples: unlike named
+# tuples, tuples of atomic values are untracked by the garbage collector, which
+# keeps full collections fast when the table is large
+KEY, DEPTH, VALUE, FLAG, MOVE, AGE = range(6)
+
+
+def bound_type(value, alpha, beta, maximizing_player):
+    """Classify a value returned by an alpha-beta search called with the
+    window (alpha, beta) as an exact value, a lower bound or an upper bound.
+
+    Parameters
+    ----------
+    value : float
+        The value returned by the search
+
+    alpha : float
+        The lower bound of the search window
+
+    beta : float
+        The upper bound of the search window
+
+    maximizing_player : bool
+        Flag indicating whether the value was returned by a maximizing layer
+        (True) or a minimizing layer (False)
+
+    Returns
+    -------
+    int
+        One of EXACT, LOWER or UPPER
+    """
+    if maximizing_player:
+        if value >= beta:
+            return LOWER
+        if value <= alpha:
+            return UPPER
+    else:
+        if value <= alpha:
+            return UPPER
+        if value >= beta:
+            return LOWER
+    return EXACT
+
+
+class TranspositionTable:
+    """Fixed-size cache of search results keyed by position.
+
+    Parameters
+    ----------
+    max_entries : int (optional)
+        The maximum number of entries held by the table. The table is split
+        into max_entries // 2 buckets of two slots.
+    """
+
+    def __init__(self, max_entries=2 ** 16):
+        self.num_buckets = max(1, max_entries // 2)
+        self.age = 0
+        self.clear()
+
+    def __len__(self):
+        return sum(1 for entry in self.deep if entry is not None) + \
+            sum(1 for entry in self.recent if entry is not None)
+
+    def clear(self):
+        """Remove all entries and reset the counters."""
+        self.deep = [None] * self.num_buckets
+        self.recent = [None] * self.num_buckets
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+
+    def new_search(self):
+        """Mark the start of a new search; entries stored by earlier searches
+        no longer take precedence in the depth-preferred slots.
+        """
+        self.age += 1
+
+    def probe(self, key):
+        """Return the entry stored for a position, or None.
+
+        Parameters
+        ----------
+        key : int
+            The position key
+
+        Returns
+        -------
+        tuple
+            The stored (key, depth, value, flag, move, age) entry for the
+            position; None if the position is not in the table
+        """
+        index = key % self.num_buckets
+        entry = self.deep[index]
+        if entry is not None and entry[KEY] == key:
+            self.hits += 1
+            return entry
+        other = self.recent[index]
+        if other is not None and other[KEY] == key:
+            self.hits += 1
+            return other
+        if entry is not None or other is not None:
+            self.collisions += 1
+        self.misses += 1
+        return None
+
+    def store(self, key, depth, value, flag, move):
+        """Store a search result for a position.
+
+        The result replaces the depth-preferred entry of its bucket when that
+        entry is for the same position, comes from an earlier search or was
+        searched to a smaller depth; the replaced entry moves to the
+        always-replace slot. Otherwise the result goes to the always-replace
+        slot.
+
+        Parameters
+        ----------
+        key : int
+            The position key
+
+        depth : int
+            The remaining search depth below the position
+
+        value : float
+            The value found by the search
+
+        flag : int
+            One of EXACT, LOWER or UPPER
+
+        move : tuple(int, int)
+            The best move found in the position
+        """
+        self.stores += 1
+        index = key % self.num_buckets
+        entry = (key, depth, value, flag, move, self.age)
+        deep = self.deep[index]
+        if deep is None or deep[KEY] == key or deep[AGE] != self.age or depth >= deep[DEPTH]:
+            if deep is not None and deep[KEY] != key:
+                self.recent[index] = deep
+            self.deep[index] = entry
+        else:
+            self.recent[index] = entry
+
+    def export(self, min_depth=0):
+        """Return the entries stored by the current search.
+
+        Parameters
+        ----------
+        min_depth : int (optional)
+            The smallest remaining search depth of the entries returned
+
+        Returns
+        -------
+        list<tuple>
+            The (key, depth, value, flag, move, age) entries, shallowest
+            first, so that `load()` lets deeper results take precedence
+        """
+        entries = [entry for entry in self.deep + self.recent
+                   if entry is not None and entry[AGE] == self.age and entry[DEPTH] >= min_depth]
+        entries.sort(key=lambda entry: entry[DEPTH])
+        return entries
+
+    def load(self, entries):
+        """Store entries exported by another table (see `export()`) as
+        results of the current search.
+        """
+        for entry in entries:
+            self.store(entry[KEY], entry[DEPTH], entry[VALUE], entry[FLAG], entry[MOVE])
+
+    def stats(self):
+        """Return the table counters as a dict."""
+        probes = self.hits + self.misses
+        return {"entries": len(self),
+                "capacity": 2 * self.num_buckets,
+                "stores": self.stores,
+                "hits": self.hits,
+                "misses": self.misses,
+                "collisions": self.collisions,
+                "hit_rate": self.hits / probes if probes else 0.}
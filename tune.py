@@ -0,0 +1,225 @@
+"""Tune the weights of a `features.FeatureEngine` heuristic by self-play.
+
+The weights are optimized with SPSA (simultaneous perturbation stochastic
+approximation). Every generation perturbs all the weights at once by a
+random +/- c_k step, plays a batch of "fair" matches (see
+`tournament.play_match()`) between an agent using the weights perturbed up
+and an agent using the weights perturbed down, and moves the weights in the
+direction of the winning perturbation. Matches are played in parallel across
+a process pool.
+
+After every generation the current weights are saved to a JSON checkpoint,
+from which an interrupted run resumes, and a line of statistics is appended
+to a JSON lines file. The checkpoint can be loaded with `load_weights()` or
+passed to `tournament.py --weights` to evaluate the tuned heuristic.
+
+Example:
+
+    python tune.py --generations 50 --matches 8 --processes 4 \\
+        --checkpoint tuned.json --stats tuning.jsonl
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import time
+
+import tournament
+
+from features import FEATURES
+from features import FeatureEngine
+from game_agent import CustomPlayer
+
+DEFAULT_WEIGHTS = {"own_moves": 1., "opp_moves": -1., "own_area": 0., "opp_area": 0.}
+
+# SPSA gain sequences: a_k = a / (k + 1 + A) ** alpha, c_k = c / (k + 1) ** gamma
+SPSA_ALPHA = 0.602
+SPSA_GAMMA = 0.101
+
+AGENT_ARGS = {"method": 'alphabeta', "iterative": True}
+
+
+def load_weights(path):
+    """Return the weights saved in a tuning checkpoint."""
+    with open(path) as f:
+        return json.load(f)["weights"]
+
+
+def tuned_engine(path):
+    """Return a `FeatureEngine` using the weights of a tuning checkpoint."""
+    return FeatureEngine(load_weights(path), name="tuned_score")
+
+
+def play_pair(task):
+    """Play one fair match between two weight vectors in a worker process.
+
+    Parameters
+    ----------
+    task : tuple
+        A (weights_1, weights_2, seed, time_limit) tuple
+
+    Returns
+    -------
+    (int, int)
+        The number of games won with each weight vector
+    """
+    weights_1, weights_2, seed, time_limit = task
+    random.seed(seed)
+    player_1 = CustomPlayer(score_fn=FeatureEngine(weights_1), **AGENT_ARGS)
+    player_2 = CustomPlayer(score_fn=FeatureEngine(weights_2), **AGENT_ARGS)
+    return tournament.play_match(player_1, player_2, time_limit=time_limit)
+
+
+class SPSATuner:
+    """Optimize feature weights by SPSA over self-play matches.
+
+    Parameters
+    ----------
+    weights : dict
+        The initial weight of each tuned feature
+
+    a, c, A : float (optional)
+        The SPSA gain parameters: the step size, the perturbation size and
+        the stability constant
+
+    matches : int (optional)
+        The number of fair matches (two games each) per generation
+
+    time_limit : float (optional)
+        The time limit per move in milliseconds
+
+    seed : int (optional)
+        The seed of the perturbations and of the match openings
+    """
+
+    def __init__(self, weights, a=0.5, c=0.5, A=10., matches=8, time_limit=tournament.TIME_LIMIT,
+                 seed=0):
+        self.weights = dict(weights)
+        self.a = a
+        self.c = c
+        self.A = A
+        self.matches = matches
+        self.time_limit = time_limit
+        self.seed = seed
+        self.generation = 0
+
+    def state(self):
+        """Return the tuner state saved in checkpoints."""
+        return {"generation": self.generation,
+                "weights": self.weights,
+                "a": self.a, "c": self.c, "A": self.A,
+                "matches": self.matches,
+                "time_limit": self.time_limit,
+                "seed": self.seed}
+
+    @classmethod
+    def from_state(cls, state):
+        """Return a tuner resuming from a checkpoint state."""
+        tuner = cls(state["weights"], a=state["a"], c=state["c"], A=state["A"],
+                    matches=state["matches"], time_limit=state["time_limit"], seed=state["seed"])
+        tuner.generation = state["generation"]
+        return tuner
+
+    def step(self, map_fn=map):
+        """Run one generation and return its statistics.
+
+        Parameters
+        ----------
+        map_fn : callable (optional)
+            The function used to play the matches, e.g. `Pool.map`
+
+        Returns
+        -------
+        dict
+            The generation number, gains, perturbed weights, results and
+            updated weights
+        """
+        k = self.generation
+        rng = random.Random("{}-{}".format(self.seed, k))
+        a_k = self.a / (k + 1 + self.A) ** SPSA_ALPHA
+        c_k = self.c / (k + 1) ** SPSA_GAMMA
+        delta = {name: rng.choice((-1., 1.)) for name in sorted(self.weights)}
+        plus = {name: value + c_k * delta[name] for name, value in self.weights.items()}
+        minus = {name: value - c_k * delta[name] for name, value in self.weights.items()}
+
+        start = time.time()
+        tasks = [(plus, minus, rng.getrandbits(32), self.time_limit) for _ in range(self.matches)]
+        results = list(map_fn(play_pair, tasks))
+        wins_plus = sum(result[0] for result in results)
+        wins_minus = sum(result[1] for result in results)
+        games = 2 * self.matches
+        outcome = (wins_plus - wins_minus) / games
+
+        self.weights = {name: value + a_k * outcome / (2 * c_k * delta[name])
+                        for name, value in self.weights.items()}
+        self.generation += 1
+        return {"generation": k,
+                "a_k": a_k,
+                "c_k": c_k,
+                "plus": plus,
+                "minus": minus,
+                "wins_plus": wins_plus,
+                "wins_minus": wins_minus,
+                "games": games,
+                "weights": self.weights,
+                "seconds": time.time() - start}
+
+
+def save_checkpoint(tuner, path):
+    """Write the tuner state to a JSON checkpoint, replacing the previous
+    one atomically.
+    """
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump(tuner.state(), f, indent=2, sort_keys=True)
+    os.replace(temp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--generations", type=int, default=20,
+                        help="number of generations to run")
+    parser.add_argument("--matches", type=int, default=8,
+                        help="number of fair matches (two games each) per generation")
+    parser.add_argument("--processes", type=int, default=multiprocessing.cpu_count(),
+                        help="number of worker processes playing the matches")
+    parser.add_argument("--time-limit", type=float, default=tournament.TIME_LIMIT,
+                        help="time limit per move in milliseconds")
+    parser.add_argument("--features", nargs="+", choices=FEATURES,
+                        help="features to tune, starting from zero weights (default: {})".format(
+                            ", ".join(sorted(DEFAULT_WEIGHTS))))
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the perturbations and openings")
+    parser.add_argument("--checkpoint", default="tuning_checkpoint.json",
+                        help="JSON file holding the current weights; resumed from if it exists")
+    parser.add_argument("--stats", default="tuning_stats.jsonl",
+                        help="JSON lines file receiving the statistics of every generation")
+    args = parser.parse_args()
+
+    if os.path.exists(args.checkpoint):
+        with open(args.checkpoint) as f:
+            tuner = SPSATuner.from_state(json.load(f))
+        print("Resuming from generation {} of {}".format(tuner.generation, args.checkpoint))
+    else:
+        weights = {name: 0. for name in args.features} if args.features else DEFAULT_WEIGHTS
+        tuner = SPSATuner(weights, matches=args.matches, time_limit=args.time_limit, seed=args.seed)
+
+    pool = multiprocessing.Pool(args.processes) if args.processes > 1 else None
+    try:
+        while tuner.generation < args.generations:
+            stats = tuner.step(pool.map if pool is not None else map)
+            save_checkpoint(tuner, args.checkpoint)
+            with open(args.stats, "a") as f:
+                f.write(json.dumps(stats) + "\n")
+            print("Generation {generation}: {wins_plus} to {wins_minus} in {seconds:.1f}s".format(**stats))
+            print("  " + ", ".join("{}={:.3f}".format(name, value)
+                                   for name, value in sorted(tuner.weights.items())))
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+
+if __name__ == "__main__":
+    main()